@@ -0,0 +1,322 @@
+import asyncio
+import functools
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from base_datos import consultar_async, obtener_conexion, obtener_conexion_async
+from metricas import contar_filas, fase
+from migraciones import asegurar_esquema, reiniciar_esquema
+
+# Backend de almacenamiento: 'mysql' en Azure, 'sqlite' para pruebas y benchmarks locales
+BACKEND = os.environ.get('BLOG_ALMACENAMIENTO', 'mysql')
+SQLITE_RUTA = os.environ.get('SQLITE_RUTA', ':memory:')
+
+
+class AlmacenamientoMySQL:
+    """Almacenamiento de producción: pools síncrono y asíncrono de base_datos"""
+
+    dialecto = 'mysql'
+
+    def __init__(self):
+        self._esquema_listo = False
+
+    @contextmanager
+    def conexion(self):
+        if not self._esquema_listo:
+            self.asegurar_esquema()
+        with obtener_conexion() as conn:
+            yield conn
+
+    async def consultar(self, sql, parametros=(), diccionario=False):
+        if not self._esquema_listo:
+            await asyncio.to_thread(self.asegurar_esquema)
+        return await consultar_async(sql, parametros, diccionario)
+
+    async def ping(self):
+        async with obtener_conexion_async():
+            pass
+
+    def asegurar_esquema(self):
+        """Aplicar las migraciones pendientes; se llama sola en el primer acceso"""
+        self._esquema_listo = asegurar_esquema()
+        return self._esquema_listo
+
+    def reiniciar_esquema(self):
+        with obtener_conexion() as conn:
+            reiniciar_esquema(conn)
+        self._esquema_listo = True
+
+
+# Mismas tablas que las migraciones de MySQL, en la versión actual del esquema
+ESQUEMA_SQLITE = '''
+CREATE TABLE IF NOT EXISTS registros_actualizacion (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_archivo TEXT NOT NULL,
+    usuario TEXT DEFAULT 'Anonimo',
+    fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    cantidad_registros INTEGER DEFAULT 0,
+    huella TEXT
+);
+CREATE TABLE IF NOT EXISTS blog_contenido (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    registro_id INTEGER,
+    dia INTEGER,
+    mes TEXT COLLATE NOCASE,
+    ano INTEGER,
+    numero_publicacion INTEGER,
+    tipo_contenido TEXT,
+    contenido TEXT,
+    estilo_id INTEGER,
+    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    ordinal INTEGER NOT NULL DEFAULT 0,
+    fecha_publicacion DATE
+);
+CREATE INDEX IF NOT EXISTS idx_contenido_fecha_id ON blog_contenido (fecha_creacion, id);
+CREATE INDEX IF NOT EXISTS idx_contenido_registro ON blog_contenido (registro_id);
+CREATE INDEX IF NOT EXISTS idx_contenido_publicacion ON blog_contenido (ano, mes, dia, numero_publicacion, id);
+CREATE INDEX IF NOT EXISTS idx_contenido_registro_publicacion
+    ON blog_contenido (registro_id, ano, mes, dia, numero_publicacion);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contenido_elemento
+    ON blog_contenido (ano, mes, dia, numero_publicacion, ordinal);
+CREATE TABLE IF NOT EXISTS blog_estilos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    huella TEXT NOT NULL UNIQUE,
+    estilo TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blog_publicaciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ano INTEGER,
+    mes TEXT COLLATE NOCASE,
+    dia INTEGER,
+    numero_publicacion INTEGER,
+    registro_id INTEGER,
+    cantidad_elementos INTEGER DEFAULT 0,
+    documento TEXT NOT NULL,
+    fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    fecha_publicacion DATE,
+    texto TEXT,
+    estilos TEXT,
+    UNIQUE (ano, mes, dia, numero_publicacion)
+);
+CREATE INDEX IF NOT EXISTS idx_publicacion_fecha_id ON blog_publicaciones (fecha_actualizacion, id);
+CREATE INDEX IF NOT EXISTS idx_publicacion_fecha_pub ON blog_publicaciones (fecha_publicacion, id);
+-- Equivalente FTS5 del índice FULLTEXT, sincronizado con triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS blog_busqueda USING fts5(
+    texto, content='blog_publicaciones', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS blog_busqueda_insertar AFTER INSERT ON blog_publicaciones BEGIN
+    INSERT INTO blog_busqueda (rowid, texto) VALUES (new.id, new.texto);
+END;
+CREATE TRIGGER IF NOT EXISTS blog_busqueda_borrar AFTER DELETE ON blog_publicaciones BEGIN
+    INSERT INTO blog_busqueda (blog_busqueda, rowid, texto) VALUES ('delete', old.id, old.texto);
+END;
+CREATE TRIGGER IF NOT EXISTS blog_busqueda_actualizar AFTER UPDATE OF texto ON blog_publicaciones BEGIN
+    INSERT INTO blog_busqueda (blog_busqueda, rowid, texto) VALUES ('delete', old.id, old.texto);
+    INSERT INTO blog_busqueda (rowid, texto) VALUES (new.id, new.texto);
+END;
+CREATE TABLE IF NOT EXISTS blog_contadores (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO blog_contadores (clave, valor) VALUES ('total_elementos', 0), ('total_registros', 0);
+CREATE TABLE IF NOT EXISTS trabajos_ingesta (
+    id TEXT PRIMARY KEY,
+    registro_id INTEGER,
+    nombre_archivo TEXT NOT NULL,
+    usuario TEXT,
+    huella TEXT,
+    parametros TEXT,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    bytes_archivo INTEGER NOT NULL DEFAULT 0,
+    filas_procesadas INTEGER NOT NULL DEFAULT 0,
+    filas_por_segundo REAL,
+    error TEXT,
+    resultado TEXT,
+    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    fecha_inicio DATETIME,
+    fecha_fin DATETIME,
+    latido REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trabajo_estado ON trabajos_ingesta (estado, fecha_creacion);
+CREATE TABLE IF NOT EXISTS trabajos_ingesta_partes (
+    trabajo_id TEXT NOT NULL,
+    parte INTEGER NOT NULL,
+    datos BLOB NOT NULL,
+    PRIMARY KEY (trabajo_id, parte)
+);
+'''
+
+TABLAS_SQLITE = ['trabajos_ingesta_partes', 'trabajos_ingesta', 'blog_busqueda', 'blog_contadores',
+                 'blog_publicaciones', 'blog_contenido', 'blog_estilos', 'registros_actualizacion']
+
+
+def _ahora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Fechas como texto 'AAAA-MM-DD HH:MM:SS', igual que devuelve NOW()
+sqlite3.register_adapter(datetime, lambda fecha: fecha.isoformat(' '))
+sqlite3.register_adapter(date, lambda fecha: fecha.isoformat())
+sqlite3.register_converter('DATETIME', lambda valor: datetime.fromisoformat(valor.decode()))
+sqlite3.register_converter('DATE', lambda valor: date.fromisoformat(valor.decode()))
+
+
+@functools.lru_cache(maxsize=256)
+def _traducir(sql):
+    """Marcadores %s de mysql-connector a los ? de sqlite3"""
+    return sql.replace('%s', '?')
+
+
+class _CursorSQLite:
+    """Cursor sqlite3 con la interfaz que usan ingesta y publicaciones"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, parametros=()):
+        self._cursor.execute(_traducir(sql), parametros)
+
+    def executemany(self, sql, filas):
+        self._cursor.executemany(_traducir(sql), filas)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class _ConexionSQLite:
+    dialecto = 'sqlite'
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _CursorSQLite(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+
+class AlmacenamientoSQLite:
+    """Sustituto local de MySQL sobre sqlite3 (en memoria por defecto).
+
+    Una sola conexión protegida por un lock: suficiente para medir los
+    handlers sin red; las lecturas asíncronas se ejecutan en un hilo.
+    """
+
+    dialecto = 'sqlite'
+
+    def __init__(self, ruta=SQLITE_RUTA):
+        self.ruta = ruta
+        self._conn = sqlite3.connect(ruta, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.create_function('NOW', 0, _ahora)
+        if ruta != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._lock = threading.RLock()
+        self._esquema_listo = False
+
+    @contextmanager
+    def _bloqueo(self):
+        # La espera por la única conexión equivale a esperar al pool
+        with fase('conexion'):
+            self._lock.acquire()
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+    @contextmanager
+    def conexion(self):
+        if not self._esquema_listo:
+            self.asegurar_esquema()
+        with self._bloqueo():
+            conn = _ConexionSQLite(self._conn)
+            try:
+                yield conn
+            finally:
+                # Igual que el pool: nunca dejar una transacción abierta
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+
+    def _consultar(self, sql, parametros, diccionario):
+        if not self._esquema_listo:
+            self.asegurar_esquema()
+        with self._bloqueo(), fase('sql'):
+            cursor = self._conn.execute(_traducir(sql), tuple(parametros))
+            try:
+                filas = cursor.fetchall()
+                columnas = [columna[0] for columna in cursor.description]
+            finally:
+                cursor.close()
+        contar_filas(len(filas))
+        if diccionario:
+            return [dict(zip(columnas, fila)) for fila in filas]
+        return filas
+
+    async def consultar(self, sql, parametros=(), diccionario=False):
+        return await asyncio.to_thread(self._consultar, sql, parametros, diccionario)
+
+    async def ping(self):
+        await self.consultar("SELECT 1")
+
+    def asegurar_esquema(self):
+        with self._lock:
+            self._conn.executescript(ESQUEMA_SQLITE)
+            self._esquema_listo = True
+        return True
+
+    def reiniciar_esquema(self):
+        with self._lock:
+            for tabla in TABLAS_SQLITE:
+                self._conn.execute(f"DROP TABLE IF EXISTS {tabla}")
+            self._conn.commit()
+            self._conn.executescript(ESQUEMA_SQLITE)
+            self._esquema_listo = True
+
+
+_BACKENDS = {
+    'mysql': AlmacenamientoMySQL,
+    'sqlite': AlmacenamientoSQLite,
+}
+
+_almacenamiento = None
+_almacenamiento_lock = threading.Lock()
+
+
+def get_almacenamiento():
+    """Almacenamiento global elegido por BLOG_ALMACENAMIENTO, creado en el primer uso"""
+    global _almacenamiento
+    if _almacenamiento is None:
+        with _almacenamiento_lock:
+            if _almacenamiento is None:
+                if BACKEND not in _BACKENDS:
+                    raise ValueError(f"BLOG_ALMACENAMIENTO desconocido: {BACKEND}")
+                _almacenamiento = _BACKENDS[BACKEND]()
+                logging.info(f"💾 Almacenamiento: {BACKEND}")
+    return _almacenamiento
+
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import queue
+import ssl
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from metricas import contar_filas, fase
+
+
+# Certificado raíz de Azure Database for MySQL, distribuido junto al código
+RUTA_CERTIFICADO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DigiCertGlobalRootG2.crt.pem')
+
+
+# Configuración DIRECTA - sin variables de entorno
+def get_db_config():
+    config = {
+        'host': 'blog-rapido-express-mysql.mysql.database.azure.com',
+        'user': 'admin_blog',
+        'password': 'PasswordSeguro123!',
+        'database': 'blog_rapido_express',
+        'port': 3306,
+        'ssl_ca': RUTA_CERTIFICADO,
+        'ssl_verify_cert': False,
+        'charset': 'utf8mb4',
+        'connect_timeout': 30
+    }
+    if os.environ.get('INGESTA_METODO') == 'infile':
+        # LOAD DATA LOCAL INFILE solo puede leer los temporales de la ingesta
+        config['allow_local_infile_in_path'] = tempfile.gettempdir()
+    return config
+
+
+# Tamaño del pool y tiempos de espera (ajustables por entorno)
+POOL_TAMANO = int(os.environ.get('DB_POOL_SIZE', '5'))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+POOL_MAX_INACTIVA = float(os.environ.get('DB_POOL_MAX_IDLE', '300'))
+
+
+class ErrorConexion(Exception):
+    """No se pudo obtener una conexión válida a la base de datos"""
+
+
+class PoolConexiones:
+    """Pool de conexiones MySQL reutilizables.
+
+    Las conexiones se validan al prestarse (ping con reconexión) y se
+    descartan si están rotas o llevan demasiado tiempo inactivas.
+    """
+
+    def __init__(self, config, tamano=POOL_TAMANO, timeout=POOL_TIMEOUT,
+                 max_inactiva=POOL_MAX_INACTIVA):
+        self.config = config
+        self.tamano = tamano
+        self.timeout = timeout
+        self.max_inactiva = max_inactiva
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(tamano)
+
+    def _crear(self):
+        # Los drivers se importan con la primera conexión, no al arrancar
+        import mysql.connector
+        try:
+            conn = mysql.connector.connect(**self.config)
+            logging.info("✅ CONEXIÓN EXITOSA A MYSQL")
+            return conn
+        except Exception as e:
+            logging.error(f"❌ ERROR DE CONEXIÓN: {str(e)}")
+            raise ErrorConexion(str(e)) from e
+
+    @staticmethod
+    def _cerrar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _validar(self, conn, inactiva_desde):
+        """Comprobar que una conexión ociosa sigue viva antes de prestarla"""
+        if time.monotonic() - inactiva_desde > self.max_inactiva:
+            # Conexión antigua: el servidor puede haberla cerrado (wait_timeout)
+            return False
+        try:
+            # ping con reconexión recupera sockets rotos sin perder el cupo
+            conn.ping(reconnect=True, attempts=1, delay=0)
+            return True
+        except Exception:
+            return False
+
+    def _tomar(self):
+        while True:
+            try:
+                conn, inactiva_desde = self._libres.get_nowait()
+            except queue.Empty:
+                return self._crear()
+            if self._validar(conn, inactiva_desde):
+                return conn
+            logging.warning("♻️ Conexión inválida descartada del pool")
+            self._cerrar(conn)
+
+    def _devolver(self, conn, rota=False):
+        # Sin ping al devolver: el próximo préstamo ya valida la conexión
+        # y _deshacer detecta las que se rompieron durante la petición
+        if rota:
+            self._cerrar(conn)
+            return
+        self._libres.put((conn, time.monotonic()))
+
+    @contextmanager
+    def conexion(self):
+        """Prestar una conexión y devolverla al pool incluso si hay errores"""
+        with fase('conexion'):
+            if not self._cupos.acquire(timeout=self.timeout):
+                raise ErrorConexion("Pool de conexiones agotado")
+        conn = None
+        rota = False
+        try:
+            with fase('conexion'):
+                conn = self._tomar()
+            yield conn
+        except Exception:
+            rota = conn is not None and not self._deshacer(conn)
+            raise
+        else:
+            # Nunca devolver al pool una transacción abierta
+            rota = not self._deshacer(conn)
+        finally:
+            if conn is not None:
+                self._devolver(conn, rota)
+            self._cupos.release()
+
+    @staticmethod
+    def _deshacer(conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool global del módulo, creado en el primer uso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexiones(get_db_config())
+    return _pool
+
+
+def obtener_conexion():
+    """Context manager que presta una conexión del pool global"""
+    return get_pool().conexion()
+
+
+# Pool asíncrono (aiomysql) para las rutas de lectura: una petición en espera
+# de MySQL no ocupa ningún hilo del worker
+POOL_ASYNC_TAMANO = int(os.environ.get('DB_POOL_ASYNC_SIZE', '20'))
+
+_pool_async = None
+_pool_async_lock = None
+
+
+def _config_async():
+    config = get_db_config()
+    if config['ssl_verify_cert']:
+        contexto_ssl = ssl.create_default_context(cafile=config['ssl_ca'])
+    else:
+        # Igual que la conexión síncrona: TLS sin verificar el certificado
+        contexto_ssl = ssl.create_default_context()
+        contexto_ssl.check_hostname = False
+        contexto_ssl.verify_mode = ssl.CERT_NONE
+    return {
+        'host': config['host'],
+        'port': config['port'],
+        'user': config['user'],
+        'password': config['password'],
+        'db': config['database'],
+        'charset': config['charset'],
+        'connect_timeout': config['connect_timeout'],
+        'ssl': contexto_ssl,
+        'autocommit': True,
+        'minsize': 1,
+        'maxsize': POOL_ASYNC_TAMANO,
+        'pool_recycle': POOL_MAX_INACTIVA,
+    }
+
+
+async def get_pool_async():
+    """Pool aiomysql del módulo, creado en el primer uso dentro del event loop"""
+    global _pool_async, _pool_async_lock
+    if _pool_async is None:
+        import aiomysql
+        if _pool_async_lock is None:
+            _pool_async_lock = asyncio.Lock()
+        async with _pool_async_lock:
+            if _pool_async is None:
+                try:
+                    _pool_async = await aiomysql.create_pool(**_config_async())
+                    logging.info("✅ POOL ASÍNCRONO A MYSQL CREADO")
+                except Exception as e:
+                    logging.error(f"❌ ERROR DE CONEXIÓN: {str(e)}")
+                    raise ErrorConexion(str(e)) from e
+    return _pool_async
+
+
+@asynccontextmanager
+async def obtener_conexion_async():
+    """Prestar una conexión del pool asíncrono.
+
+    Sin ping al prestarla: aiomysql ya descarta las conexiones cerradas y
+    las que superan pool_recycle, así que cada lectura cuesta una sola ida
+    y vuelta a la base de datos.
+    """
+    with fase('conexion'):
+        pool = await get_pool_async()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout=POOL_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            raise ErrorConexion("Pool de conexiones agotado") from e
+        except Exception as e:
+            raise ErrorConexion(str(e)) from e
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+async def consultar_async(sql, parametros=(), diccionario=False):
+    """Ejecutar una consulta de lectura en el pool asíncrono y devolver sus filas"""
+    import aiomysql
+    async with obtener_conexion_async() as conn:
+        with fase('sql'):
+            async with conn.cursor(aiomysql.DictCursor if diccionario else aiomysql.Cursor) as cursor:
+                await cursor.execute(sql, parametros)
+                filas = await cursor.fetchall()
+        contar_filas(len(filas))
+        return filas
@@ -0,0 +1,78 @@
+import re
+import unicodedata
+
+# Elementos con texto legible; las imágenes (I) sólo tienen una URL
+TIPOS_BUSCABLES = ('T', 'ST', 'P')
+# Términos de una consulta que se tienen en cuenta (acota el coste del MATCH)
+MAX_TERMINOS = 16
+
+_PALABRA = re.compile(r'\w+')
+
+# Ranking de mayor a menor relevancia y desempate por id, paginado por clave.
+# El texto se indexa tal cual: la colación utf8mb4_unicode_ci de MySQL y el
+# tokenizador unicode61 de FTS5 ya ignoran mayúsculas y tildes.
+_SQL_BUSCAR = {
+    'mysql': '''
+        SELECT id, relevancia, documento, estilos FROM (
+            SELECT id, documento, estilos, ROUND(MATCH(texto) AGAINST (%s IN NATURAL LANGUAGE MODE), 6) AS relevancia
+            FROM blog_publicaciones
+            WHERE MATCH(texto) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        ) r
+        {condicion}
+        ORDER BY relevancia DESC, id DESC
+        LIMIT %s
+    ''',
+    'sqlite': '''
+        SELECT id, relevancia, documento, estilos FROM (
+            SELECT p.id, p.documento, p.estilos, ROUND(-bm25(blog_busqueda), 6) AS relevancia
+            FROM blog_busqueda
+            JOIN blog_publicaciones p ON p.id = blog_busqueda.rowid
+            WHERE blog_busqueda MATCH %s
+        ) r
+        {condicion}
+        ORDER BY relevancia DESC, id DESC
+        LIMIT %s
+    ''',
+}
+
+
+class ErrorBusqueda(ValueError):
+    """Consulta de búsqueda vacía o sin términos válidos"""
+
+
+def plegar(texto):
+    """Minúsculas y sin tildes ni diéresis: 'Envíos Pingüino' -> 'envios pinguino'"""
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def texto_publicacion(elementos):
+    """Texto indexable de los títulos, subtítulos y párrafos de una publicación"""
+    return ' '.join(
+        elemento['contenido'] or '' for elemento in elementos
+        if elemento['tipo_contenido'] in TIPOS_BUSCABLES
+    )
+
+
+def terminos_busqueda(consulta):
+    """Palabras plegadas de la consulta, sin repetir y en su orden original"""
+    terminos = list(dict.fromkeys(_PALABRA.findall(plegar(consulta or ''))))[:MAX_TERMINOS]
+    if not terminos:
+        raise ErrorBusqueda("La búsqueda necesita al menos una palabra (?q=)")
+    return terminos
+
+
+def consulta_busqueda(dialecto, terminos, after, limite):
+    """SQL y parámetros de una página de resultados; `after` es (relevancia, id)"""
+    if dialecto == 'mysql':
+        expresion = ' '.join(terminos)
+        parametros = [expresion, expresion]
+    else:
+        # FTS5: cualquiera de los términos, cada uno entre comillas como literal
+        parametros = [' OR '.join(f'"{termino}"' for termino in terminos)]
+    condicion = ""
+    if after:
+        relevancia, ultimo_id = after
+        condicion = "WHERE relevancia < %s OR (relevancia = %s AND id < %s)"
+        parametros += [relevancia, relevancia, ultimo_id]
+    return _SQL_BUSCAR[dialecto].format(condicion=condicion), parametros + [limite + 1]
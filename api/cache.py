@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from respuestas import comprimir
+
+# Duración y tamaño de la caché de respuestas (ajustables por entorno)
+CACHE_TTL = float(os.environ.get('CACHE_TTL', '60'))
+CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', '256'))
+# El detalle de una carga sólo cambia con otra escritura, que lo invalida
+CACHE_DETALLE_TTL = float(os.environ.get('CACHE_DETALLE_TTL', '3600'))
+
+
+class RespuestaCacheada:
+    """Cuerpo JSON ya serializado junto con su huella y sus variantes comprimidas"""
+
+    __slots__ = ('cuerpo', 'huella', '_codificadas')
+
+    def __init__(self, cuerpo):
+        if isinstance(cuerpo, str):
+            cuerpo = cuerpo.encode('utf-8')
+        self.cuerpo = cuerpo
+        self.huella = hashlib.sha1(cuerpo).hexdigest()
+        self._codificadas = {}
+
+    def etag(self, codificacion=None):
+        """ETag fuerte de la variante: cada codificación es una representación distinta"""
+        if codificacion:
+            return f'"{self.huella}-{codificacion}"'
+        return f'"{self.huella}"'
+
+    def codificada(self, codificacion):
+        """Comprimir una sola vez por entrada y codificación"""
+        if codificacion not in self._codificadas:
+            self._codificadas[codificacion] = comprimir(self.cuerpo, codificacion)
+        return self._codificadas[codificacion]
+
+    def coincide(self, if_none_match, codificacion=None):
+        """Comprobar una cabecera If-None-Match contra el ETag de la variante"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        etag = self.etag(codificacion)
+        etiquetas = (e.strip() for e in if_none_match.split(','))
+        return any(e.removeprefix('W/') == etag for e in etiquetas)
+
+
+class CacheRespuestas:
+    """Caché en proceso con TTL, desalojo LRU y carga única por clave.
+
+    Las entradas se asocian a la versión de los datos vigente cuando se
+    empezó a cargarlas; `invalidar()` sube la versión y las descarta todas.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_entradas=CACHE_MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.version = 0
+        self._entradas = OrderedDict()
+        self._cargando_async = {}
+        self._lock = threading.Lock()
+
+    def _vigente(self, clave):
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        version, expira, valor = entrada
+        if version != self.version or expira < time.monotonic():
+            del self._entradas[clave]
+            return None
+        self._entradas.move_to_end(clave)
+        return valor
+
+    async def obtener_async(self, clave, cargar):
+        """Devolver el valor en caché o cargarlo con la corrutina `cargar`; las cargas concurrentes se agrupan"""
+        while True:
+            with self._lock:
+                valor = self._vigente(clave)
+                if valor is not None:
+                    return valor
+                en_curso = self._cargando_async.get(clave)
+                if en_curso is None:
+                    en_curso = asyncio.get_running_loop().create_future()
+                    self._cargando_async[clave] = en_curso
+                    version = self.version
+                    break
+            # Esperar sin bloquear el event loop; shield evita cancelar la carga compartida
+            await asyncio.shield(en_curso)
+
+        try:
+            valor = await cargar()
+            self._guardar(clave, version, valor)
+            return valor
+        finally:
+            with self._lock:
+                del self._cargando_async[clave]
+            en_curso.set_result(None)
+
+    def _guardar(self, clave, version, valor):
+        with self._lock:
+            if version == self.version:
+                self._entradas[clave] = (version, time.monotonic() + self.ttl, valor)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+
+    def invalidar(self):
+        """Descartar todo tras una escritura (subida o reseteo)"""
+        with self._lock:
+            self.version += 1
+            self._entradas.clear()
+
+
+cache_respuestas = CacheRespuestas()
+# Detalle por registro_id: un registro se llena mientras dura su carga y
+# las cargas posteriores se quedan con los elementos que cambian
+cache_detalle = CacheRespuestas(ttl=CACHE_DETALLE_TTL)
+
+
+def invalidar_caches():
+    """Descartar todas las respuestas en caché tras una escritura"""
+    cache_respuestas.invalidar()
+    cache_detalle.invalidar()
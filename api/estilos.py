@@ -0,0 +1,79 @@
+import hashlib
+import json
+
+# Formatos de /blog y /buscar: elementos como objetos o como filas [tipo, contenido, estilo_id]
+FORMATOS = ('completo', 'compacto')
+COLUMNAS_COMPACTAS = ('tipo_contenido', 'contenido', 'estilo')
+
+# Alta de estilos por huella; si otra carga ya lo creó se conserva su id
+_SQL_INSERTAR = {
+    'mysql': "INSERT INTO blog_estilos (huella, estilo) VALUES {valores} ON DUPLICATE KEY UPDATE huella = huella",
+    'sqlite': "INSERT INTO blog_estilos (huella, estilo) VALUES {valores} ON CONFLICT (huella) DO NOTHING",
+}
+
+
+class ErrorFormato(ValueError):
+    """Formato de respuesta desconocido"""
+
+
+def leer_formato(valor):
+    if not valor:
+        return FORMATOS[0]
+    if valor not in FORMATOS:
+        raise ErrorFormato(f"Formato inválido: {valor} (use {' o '.join(FORMATOS)})")
+    return valor
+
+
+def huella_estilo(estilo):
+    """Clave única del estilo: MySQL no indexa un TEXT completo"""
+    return hashlib.sha256(estilo.encode('utf-8')).hexdigest()
+
+
+def internar_estilos(cursor, estilos, conocidos, dialecto='mysql'):
+    """Guardar en blog_estilos los `estilos` que falten y anotar su id en `conocidos`.
+
+    `conocidos` (estilo -> id) vive lo que dura una carga: cada estilo
+    distinto cuesta una consulta por lote sólo la primera vez que
+    aparece. Devuelve cuántos estilos se crearon.
+    """
+    nuevos = {estilo for estilo in estilos if estilo and estilo not in conocidos}
+    if not nuevos:
+        return 0
+    huellas = {huella_estilo(estilo): estilo for estilo in nuevos}
+    cursor.execute(
+        _SQL_INSERTAR[dialecto].format(valores=', '.join(['(%s, %s)'] * len(huellas))),
+        [valor for huella, estilo in huellas.items() for valor in (huella, estilo)]
+    )
+    creados = cursor.rowcount
+    cursor.execute(
+        f"SELECT id, huella FROM blog_estilos WHERE huella IN ({', '.join(['%s'] * len(huellas))})",
+        list(huellas)
+    )
+    for estilo_id, huella in cursor.fetchall():
+        conocidos[huellas[huella]] = estilo_id
+    return max(creados, 0)
+
+
+def lista_estilos(elementos):
+    """Ids de estilo distintos de una publicación, como se guardan en blog_publicaciones.estilos"""
+    return ','.join(map(str, sorted({e['estilo_id'] for e in elementos if e['estilo_id'] is not None})))
+
+
+def ids_pagina(listas):
+    """Ids de estilo de todas las publicaciones de una página"""
+    return sorted({int(estilo_id) for lista in listas if lista for estilo_id in lista.split(',')})
+
+
+def consulta_diccionario(ids):
+    """SQL y parámetros del diccionario id -> estilo de una página"""
+    return f"SELECT id, estilo FROM blog_estilos WHERE id IN ({', '.join(['%s'] * len(ids))})", list(ids)
+
+
+def expandir_documento(documento, diccionario):
+    """Publicación con sus elementos como objetos a partir del documento compacto guardado"""
+    publicacion = json.loads(documento)
+    publicacion['elementos'] = [
+        {'tipo_contenido': tipo_contenido, 'contenido': contenido, 'estilo': diccionario.get(estilo_id, '')}
+        for tipo_contenido, contenido, estilo_id in publicacion['elementos']
+    ]
+    return publicacion
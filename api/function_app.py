@@ -1,510 +1,632 @@
 ﻿import azure.functions as func
-import json
-import mysql.connector
+import asyncio
 import os
 import logging
-import csv
-import io
-from datetime import datetime
+from datetime import date, datetime
 
-# Configuración DIRECTA - sin variables de entorno
-def get_db_config():
-    return {
-        'host': 'blog-rapido-express-mysql.mysql.database.azure.com',
-        'user': 'admin_blog',
-        'password': 'PasswordSeguro123!',
-        'database': 'blog_rapido_express',
-        'port': 3306,
-        'ssl_ca': './DigiCertGlobalRootG2.crt.pem',
-        'ssl_verify_cert': False,
-        'charset': 'utf8mb4',
-        'connect_timeout': 30
-    }
+from almacenamiento import get_almacenamiento
+from base_datos import ErrorConexion
+from busqueda import ErrorBusqueda, consulta_busqueda, terminos_busqueda
+from cache import RespuestaCacheada, cache_detalle, cache_respuestas, invalidar_caches
+from estilos import (
+    COLUMNAS_COMPACTAS,
+    ErrorFormato,
+    consulta_diccionario,
+    expandir_documento,
+    ids_pagina,
+    leer_formato,
+)
+from ingesta import (
+    carga_identica,
+    comprobar_extension,
+    contar_tipos,
+    huella_archivo,
+    registrar_carga,
+    validar_archivo,
+)
+from metricas import fase, instrumentar, registro_metricas
+from paginacion import ErrorPaginacion, codificar_cursor, decodificar_cursor, leer_limite, leer_rango_fechas
+from publicaciones import materializar_publicaciones
+from respuestas import codificacion_respuesta, respuesta_bytes, respuesta_json, respuesta_vacia, serializar
+from trabajos import (
+    BACKEND_COLA,
+    NOMBRE_COLA,
+    SUBIDA_ASINCRONA_BYTES,
+    archivo_trabajo,
+    crear_trabajo,
+    en_curso,
+    finalizar_trabajo,
+    get_cola,
+    leer_trabajo,
+    progreso_local,
+    reclamar_trabajo,
+    tamano_flujo,
+)
+from validacion import TIPOS_CONTENIDO, ErrorArchivo, ErrorValidacion
+
+# Almacenamiento según BLOG_ALMACENAMIENTO. Importar el módulo sólo registra rutas:
+# ni conexiones ni DDL (el esquema se asegura en el primer acceso a la BD)
+almacen = get_almacenamiento()
+
+app = func.FunctionApp()
+
+# Tiempo máximo de la sonda de readiness (segundos)
+READY_TIMEOUT = float(os.environ.get('READY_TIMEOUT', '2'))
+
+# /blog pagina por publicación, no por elemento
+PUBLICACIONES_POR_PAGINA = 10
+MAX_PUBLICACIONES_POR_PAGINA = 50
+# Órdenes de /blog: columna de blog_publicaciones y tipo de su valor en el cursor
+ORDENES_BLOG = {'actualizacion': 'fecha_actualizacion', 'publicacion': 'fecha_publicacion'}
+ORDENES_CURSOR = {'actualizacion': datetime, 'publicacion': date}
+
+async def leer_contadores():
+    filas = await almacen.consultar("SELECT clave, valor FROM blog_contadores")
+    return {clave: int(valor) for clave, valor in filas}
 
-def get_db_connection():
+@app.route(route="live", methods=["GET"])
+@instrumentar('live')
+async def liveness_check(req: func.HttpRequest) -> func.HttpResponse:
+    """Liveness: el proceso responde; nunca toca la base de datos"""
+    return respuesta_json(req, {"status": "alive", "timestamp": datetime.now().isoformat()})
+
+@app.route(route="ready", methods=["GET"])
+@instrumentar('ready')
+async def readiness_check(req: func.HttpRequest) -> func.HttpResponse:
+    """Readiness: ping con límite de tiempo sobre una conexión del pool"""
     try:
-        config = get_db_config()
-        conn = mysql.connector.connect(**config)
-        logging.info("✅ CONEXIÓN EXITOSA A MYSQL")
-        return conn
-    except Exception as e:
-        logging.error(f"❌ ERROR DE CONEXIÓN: {str(e)}")
-        return None
-
-# Crear certificado SSL si no existe
-cert_content = """-----BEGIN CERTIFICATE-----
-MIIDjjCCAnagAwIBAgIQAzrx5qcRqaC7KGSxHQn65TANBgkqhkiG9w0BAQsFADBh
-MQswCQYDVQQGEwJVUzEVMBMGA1UEChMMRigl2aUNlcnQgSW5jMRkwFwYDVQQLExB3
-d3cuZGlnaWNlcnQuY29tMSAwHgYDVQQDExdEaWdpQ2VydCBHbG9iYWwgUm9vdCBH
-MjAeFw0xMzA4MDExMjAwMDBaFw0zODAxMTUxMjAwMDBaMGExCzAJBgNVBAYTAlVT
-MRUwEwYDVQQKEwxEaWdpQ2VydCBJbmMxGTAXBgNVBAsTEHd3dy5kaWdpY2VydC5j
-b20xIDAeBgNVBAMTF0RpZ2lDZXR0IEdsb2JhbCBSb290IEcyMIIBIjANBgkqhkiG
-9w0BAQEFAAOCAQ8AMIIBCgKCAQEAuzfNNNx7a8myaJCtSnX/RrohCgiN9RlUyfuI
-2/Ou8jqJkTx65qsGGmvPrC3oXgkkRLpimn7Wo6h+4FR1IAWsULecYxpsMNzaHxmx
-1x7e/dfgy5SDN67sH0NO3Xss0r0upS/kqbitOtSZpLYl6ZtrAGCSYP9PIUkY92eQ
-q2EGnI/yuum06ZIya7XzV+hdG82MHauVBJVJ8zUtluNJbd134/tJS7SsVQepj5Wz
-tCO7TG1F8PapspUwtP1MVYwnSlcUfIKdzXOS0xZKBgyMUNGPHgm+F6HmIcr9g+UQ
-vIOlCsRnKPZzFBQ9RnbDhxSJITRNrw9FDKZJobq7nMWxM4MphQIDAQABo0IwQDAP
-BgNVHRMBAf8EBTADAQH/MA4GA1UdDwEB/wQEAwIBhjAdBgNVHQ4EFgQUTiJUIBiV
-5uNu5g/6+rkS7QYXjzkwDQYJKoZIhvcNAQELBQADggEBAGBnKJRvDkhj6zHd6mcY
-1Yl9PMWLSn/pvtsrF9+wX3N3KjITOYFnQoQj8kVnNeyIv/iPsGEMNKSuIEyExtv4
-NeF22d+mQrvHRAiGfzZ0JFrabA0UWTW98kndth/Jsw1HKj2ZL7tcu7XUIOGZX1NG
-Fdtom/DzMNU+MeKNhJ7jitralj41E6Vf8PlwUHBHQRFXGU7Aj64GxJUTFy8bJZ91
-8rGOmaFvE7FBcf6IKshPECBV1/MUReXgRPTqh5Uykw7+U0b6LJ3/iyK5S9kJRaTe
-pLiaWN0bfVKfjllDiIGknibVb63dDcY3fe0Dkhvld1927jyNxF1WW6LZZm6zNTfl
-MrY=
------END CERTIFICATE-----"""
-
-# Crear archivo de certificado
-with open('./DigiCertGlobalRootG2.crt.pem', 'w') as f:
-    f.write(cert_content)
-
-# Inicializar tablas al cargar la función
-def initialize_tables():
-    """Inicializar tablas si no existen"""
-    conn = get_db_connection()
-    if not conn:
-        logging.error("No se pudo conectar para inicializar tablas")
-        return False
-    
+        await asyncio.wait_for(almacen.ping(), timeout=READY_TIMEOUT)
+        return respuesta_json(req, {"status": "ready", "database": "connected"})
+    except (ErrorConexion, asyncio.TimeoutError) as e:
+        return respuesta_json(req, {"status": "not_ready", "database": "disconnected", "error": str(e) or "timeout"}, status_code=503)
+
+@app.route(route="health", methods=["GET"])
+@instrumentar('health')
+async def health_check(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        cursor = conn.cursor()
-        
-        # Verificar si las tablas existen
-        cursor.execute("SHOW TABLES LIKE 'registros_actualizacion'")
-        if not cursor.fetchone():
-            # Crear tabla de registros si no existe
-            cursor.execute('''
-                CREATE TABLE registros_actualizacion (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nombre_archivo VARCHAR(255) NOT NULL,
-                    usuario VARCHAR(100) DEFAULT 'Anonimo',
-                    fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    cantidad_registros INT DEFAULT 0
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            ''')
-            logging.info("✅ Tabla registros_actualizacion creada")
-        
-        cursor.execute("SHOW TABLES LIKE 'blog_contenido'")
-        if not cursor.fetchone():
-            # Crear tabla de contenido si no existe
-            cursor.execute('''
-                CREATE TABLE blog_contenido (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    registro_id INT,
-                    dia INT,
-                    mes VARCHAR(50),
-                    ano INT,
-                    numero_publicacion INT,
-                    tipo_contenido VARCHAR(10),
-                    contenido TEXT,
-                    estilo TEXT,
-                    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            ''')
-            logging.info("✅ Tabla blog_contenido creada")
-        
-        conn.commit()
-        logging.info("✅ Tablas inicializadas correctamente")
-        return True
+        db_status = "disconnected"
+        contadores = {}
+        try:
+            # Totales mantenidos por /subir y /reset-tables: sin COUNT(*) por sonda
+            contadores = await cache_respuestas.obtener_async(('contadores',), leer_contadores)
+            db_status = "connected"
+        except ErrorConexion:
+            pass
+        except Exception as e:
+            logging.error(f"Error leyendo contadores: {str(e)}")
         
+        return respuesta_json(req, {
+            "status": "healthy", 
+            "database": db_status,
+            "total_elementos": contadores.get('total_elementos', 0),
+            "total_registros": contadores.get('total_registros', 0),
+            "timestamp": datetime.now().isoformat()
+        })
     except Exception as e:
-        logging.error(f"❌ Error inicializando tablas: {str(e)}")
-        return False
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+        return respuesta_json(req, {"status": "error", "error": str(e)}, status_code=500)
 
-# Inicializar tablas al inicio
-initialize_tables()
+async def responder_cacheado(req, clave, cargar, cache=cache_respuestas):
+    """Servir un JSON desde la caché con ETag; 304 si el cliente ya lo tiene"""
+    async def cargar_respuesta():
+        return RespuestaCacheada(await cargar())
+    
+    respuesta = await cache.obtener_async(clave, cargar_respuesta)
+    codificacion = codificacion_respuesta(req, respuesta.cuerpo)
+    headers = {"ETag": respuesta.etag(codificacion), "Cache-Control": "no-cache"}
+    if respuesta.coincide(req.headers.get('If-None-Match'), codificacion):
+        return respuesta_vacia(304, headers)
+    # La variante comprimida se calcula una vez y vive con la entrada de caché
+    return respuesta_bytes(req, respuesta.cuerpo, headers=headers, comprimido=respuesta.codificada)
 
-app = func.FunctionApp()
+async def consultar_blog(after, limite, orden='actualizacion', rango=None, formato='completo'):
+    """Página de publicaciones completas serializada como JSON.
+    
+    Los documentos de blog_publicaciones ya están agrupados y serializados
+    en la carga: en formato compacto sólo se concatenan.
+    """
+    # Paginación por clave (columna de orden, id): coste constante a cualquier profundidad.
+    # Con orden=publicacion el rango y el cursor se resuelven sobre idx_publicacion_fecha_pub.
+    columna = ORDENES_BLOG[orden]
+    condiciones = []
+    parametros = []
+    if orden == 'publicacion':
+        condiciones.append("fecha_publicacion IS NOT NULL")
+    if rango:
+        inicio, fin = rango
+        if inicio:
+            condiciones.append("fecha_publicacion >= %s")
+            parametros.append(inicio)
+        if fin:
+            condiciones.append("fecha_publicacion <= %s")
+            parametros.append(fin)
+    if after:
+        fecha, ultimo_id = after
+        condiciones.append(f"({columna} < %s OR ({columna} = %s AND id < %s))")
+        parametros += [fecha, fecha, ultimo_id]
+    condicion = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+    
+    publicaciones = await almacen.consultar(f'''
+        SELECT id, {columna}, documento, estilos
+        FROM blog_publicaciones 
+        {condicion}
+        ORDER BY {columna} DESC, id DESC
+        LIMIT %s
+    ''', parametros + [limite + 1])
+    return await pagina_publicaciones(publicaciones, limite, formato)
 
-@app.route(route="health", methods=["GET"])
-def health_check(req: func.HttpRequest) -> func.HttpResponse:
+async def consultar_busqueda(terminos, after, limite, formato='completo'):
+    """Página de publicaciones que contienen alguno de los términos, por relevancia"""
+    sql, parametros = consulta_busqueda(almacen.dialecto, terminos, after, limite)
+    return await pagina_publicaciones(await almacen.consultar(sql, parametros), limite, formato)
+
+async def pagina_publicaciones(filas, limite, formato='completo'):
+    """JSON de una página a partir de filas (id, clave de orden, documento, estilos).
+    
+    Se piden `limite + 1` filas: si llega la extra hay página siguiente y el
+    cursor es la clave de orden de la última fila servida.
+    Los documentos guardan cada elemento como [tipo, contenido, estilo_id]:
+    el formato compacto los sirve tal cual con el diccionario de estilos de
+    la página; el completo repite en cada elemento el texto de su estilo.
+    """
+    next_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultimo_id, ultima_clave, _, _ = filas[-1]
+        next_cursor = codificar_cursor(ultima_clave, ultimo_id)
+    
+    ids = ids_pagina(estilos for _, _, _, estilos in filas)
+    diccionario = {}
+    if ids:
+        sql, parametros = consulta_diccionario(ids)
+        diccionario = dict(await almacen.consultar(sql, parametros))
+    
+    if formato == 'compacto':
+        with fase('serializacion'):
+            return (
+                b'{"columnas":' + serializar(COLUMNAS_COMPACTAS)
+                + b',"estilos":' + serializar({str(estilo_id): estilo for estilo_id, estilo in diccionario.items()})
+                + b',"publicaciones":[' + b','.join(documento.encode('utf-8') for _, _, documento, _ in filas)
+                + b'],"next_cursor":' + serializar(next_cursor) + b'}'
+            )
+    with fase('serializacion'):
+        publicaciones = [expandir_documento(documento, diccionario) for _, _, documento, _ in filas]
+    return serializar({"publicaciones": publicaciones, "next_cursor": next_cursor})
+
+async def consultar_historial():
+    historial = await almacen.consultar('''
+        SELECT id, nombre_archivo, usuario, fecha_actualizacion, cantidad_registros
+        FROM registros_actualizacion 
+        ORDER BY fecha_actualizacion DESC 
+        LIMIT 50
+    ''', diccionario=True)
+    
+    return serializar(historial)
+
+class RegistroNoEncontrado(Exception):
+    """El registro de actualización pedido no existe"""
+
+async def consultar_detalle(registro_id, after, limite):
+    """Metadatos de una carga y una página de sus elementos en una sola consulta"""
+    # LEFT JOIN: el registro se devuelve aunque no tenga (más) elementos;
+    # idx_contenido_registro resuelve registro_id = ? AND id > ? ya ordenado por id
+    filas = await almacen.consultar('''
+        SELECT r.id, r.nombre_archivo, r.usuario, r.fecha_actualizacion, r.cantidad_registros,
+               c.id AS contenido_id, c.dia, c.mes, c.ano, c.numero_publicacion,
+               c.tipo_contenido, c.contenido, COALESCE(e.estilo, '') AS estilo
+        FROM registros_actualizacion r
+        LEFT JOIN blog_contenido c ON c.registro_id = r.id AND c.id > %s
+        LEFT JOIN blog_estilos e ON e.id = c.estilo_id
+        WHERE r.id = %s
+        ORDER BY c.id
+        LIMIT %s
+    ''', (after or 0, registro_id, limite + 1), diccionario=True)
+    
+    if not filas:
+        raise RegistroNoEncontrado(registro_id)
+    
+    primera = filas[0]
+    registro = {campo: primera[campo] for campo in (
+        'id', 'nombre_archivo', 'usuario', 'fecha_actualizacion', 'cantidad_registros'
+    )}
+    contenido = [
+        {campo: fila[campo] for campo in (
+            'dia', 'mes', 'ano', 'numero_publicacion', 'tipo_contenido', 'contenido', 'estilo'
+        )}
+        for fila in filas[:limite] if fila['contenido_id'] is not None
+    ]
+    next_cursor = codificar_cursor(filas[limite - 1]['contenido_id']) if len(filas) > limite else None
+    
+    return serializar({"registro": registro, "contenido": contenido, "next_cursor": next_cursor})
+
+@app.route(route="blog", methods=["GET"])
+@instrumentar('blog')
+async def get_blog(req: func.HttpRequest) -> func.HttpResponse:
+    """Publicaciones del blog paginadas por cursor (?after=&limit=).
+    
+    Filtros por fecha de publicación: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD y
+    archivo anual o mensual con ?ano=2024&mes=octubre. Con algún filtro, o
+    con ?orden=publicacion, se ordena por fecha de publicación.
+    ?formato=compacto devuelve los elementos como filas y un diccionario de estilos.
+    """
     try:
-        conn = get_db_connection()
-        db_status = "connected" if conn else "disconnected"
-        
-        total_elementos = 0
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) as total FROM blog_contenido")
-                total_elementos = cursor.fetchone()[0]
-                cursor.close()
-                conn.close()
-            except Exception as e:
-                logging.error(f"Error contando elementos: {str(e)}")
+        limite = leer_limite(req.params.get('limit'), defecto=PUBLICACIONES_POR_PAGINA, maximo=MAX_PUBLICACIONES_POR_PAGINA)
+        rango = leer_rango_fechas(
+            req.params.get('desde'), req.params.get('hasta'),
+            req.params.get('ano'), req.params.get('mes')
+        )
+        orden = req.params.get('orden') or ('publicacion' if rango else 'actualizacion')
+        if orden not in ORDENES_BLOG:
+            raise ErrorPaginacion(f"Orden inválido: {orden}")
+        formato = leer_formato(req.params.get('formato'))
+        after = req.params.get('after')
+        clave_after = decodificar_cursor(after, ORDENES_CURSOR[orden], int) if after else None
         
-        return func.HttpResponse(
-            json.dumps({
-                "status": "healthy", 
-                "database": db_status,
-                "total_elementos": total_elementos,
-                "timestamp": datetime.now().isoformat()
-            }),
-            status_code=200,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
+        return await responder_cacheado(
+            req,
+            ('blog', orden, rango, clave_after, limite, formato),
+            lambda: consultar_blog(clave_after, limite, orden, rango, formato)
         )
+        
+    except (ErrorPaginacion, ErrorFormato) as e:
+        return respuesta_json(req, {"error": str(e)}, status_code=400)
+    except ErrorConexion:
+        return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
     except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"status": "error", "error": str(e)}),
-            status_code=500,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
+        logging.error(f"Error en /blog: {str(e)}")
+        return respuesta_json(req, {"error": f"Error del servidor: {str(e)}"}, status_code=500)
 
-@app.route(route="blog", methods=["GET"])
-def get_blog(req: func.HttpRequest) -> func.HttpResponse:
+@app.route(route="buscar", methods=["GET"])
+@instrumentar('buscar')
+async def buscar(req: func.HttpRequest) -> func.HttpResponse:
+    """Búsqueda de texto completo en títulos, subtítulos y párrafos (?q=&after=&limit=).
+    
+    No distingue mayúsculas ni tildes; devuelve publicaciones completas
+    ordenadas por relevancia, en el mismo ?formato= que /blog.
+    """
     try:
-        conn = get_db_connection()
-        if not conn:
-            return func.HttpResponse(
-                json.dumps({"error": "No se pudo conectar a la base de datos"}),
-                status_code=500,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-        
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT dia, mes, ano, numero_publicacion, tipo_contenido, contenido, estilo
-            FROM blog_contenido 
-            ORDER BY fecha_creacion DESC
-            LIMIT 100
-        ''')
-        contenido = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        terminos = terminos_busqueda(req.params.get('q'))
+        limite = leer_limite(req.params.get('limit'), defecto=PUBLICACIONES_POR_PAGINA, maximo=MAX_PUBLICACIONES_POR_PAGINA)
+        formato = leer_formato(req.params.get('formato'))
+        after = req.params.get('after')
+        clave_after = decodificar_cursor(after, float, int) if after else None
         
-        return func.HttpResponse(
-            json.dumps(contenido, default=str),
-            status_code=200,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
+        return await responder_cacheado(
+            req,
+            ('buscar', tuple(terminos), clave_after, limite, formato),
+            lambda: consultar_busqueda(terminos, clave_after, limite, formato)
         )
         
+    except (ErrorBusqueda, ErrorPaginacion, ErrorFormato) as e:
+        return respuesta_json(req, {"error": str(e)}, status_code=400)
+    except ErrorConexion:
+        return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
     except Exception as e:
-        logging.error(f"Error en /blog: {str(e)}")
-        return func.HttpResponse(
-            json.dumps({"error": f"Error del servidor: {str(e)}"}),
-            status_code=500,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
+        logging.error(f"Error en /buscar: {str(e)}")
+        return respuesta_json(req, {"error": f"Error del servidor: {str(e)}"}, status_code=500)
 
 @app.route(route="historial", methods=["GET"])
-def get_historial(req: func.HttpRequest) -> func.HttpResponse:
+@instrumentar('historial')
+async def get_historial(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        conn = get_db_connection()
-        if not conn:
-            return func.HttpResponse(
-                json.dumps({"error": "No se pudo conectar a la base de datos"}),
-                status_code=500,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-        
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT id, nombre_archivo, usuario, fecha_actualizacion, cantidad_registros
-            FROM registros_actualizacion 
-            ORDER BY fecha_actualizacion DESC 
-            LIMIT 50
-        ''')
-        historial = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        return func.HttpResponse(
-            json.dumps(historial, default=str),
-            status_code=200,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
+        return await responder_cacheado(req, ('historial',), consultar_historial)
+    except ErrorConexion:
+        return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
     except Exception as e:
         logging.error(f"Error en /historial: {str(e)}")
-        return func.HttpResponse(
-            json.dumps({"error": f"Error del servidor: {str(e)}"}),
-            status_code=500,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
+        return respuesta_json(req, {"error": f"Error del servidor: {str(e)}"}, status_code=500)
+
+@app.route(route="detalle/{registro_id:int}", methods=["GET"])
+@instrumentar('detalle')
+async def get_detalle(req: func.HttpRequest) -> func.HttpResponse:
+    """Detalle de una carga: registro y sus elementos paginados (?after=&limit=)"""
+    try:
+        registro_id = int(req.route_params.get('registro_id'))
+        limite = leer_limite(req.params.get('limit'))
+        after = req.params.get('after')
+        ultimo_id = decodificar_cursor(after, int)[0] if after else None
+        
+        return await responder_cacheado(
+            req,
+            ('detalle', registro_id, ultimo_id, limite),
+            lambda: consultar_detalle(registro_id, ultimo_id, limite),
+            cache=cache_detalle
         )
+        
+    except RegistroNoEncontrado:
+        return respuesta_json(req, {"error": "Registro no encontrado"}, status_code=404)
+    except ErrorPaginacion as e:
+        return respuesta_json(req, {"error": str(e)}, status_code=400)
+    except ErrorConexion:
+        return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
+    except Exception as e:
+        logging.error(f"Error en /detalle: {str(e)}")
+        return respuesta_json(req, {"error": f"Error del servidor: {str(e)}"}, status_code=500)
+
+@app.route(route="metrics", methods=["GET"])
+async def metrics(req: func.HttpRequest) -> func.HttpResponse:
+    """Histogramas y contadores del proceso en formato de texto de Prometheus"""
+    return func.HttpResponse(
+        registro_metricas.exportar(),
+        status_code=200,
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
 
 @app.route(route="test", methods=["GET"])
-def test_connection(req: func.HttpRequest) -> func.HttpResponse:
-    conn = get_db_connection()
-    if conn:
-        conn.close()
-        return func.HttpResponse(
-            json.dumps({"status": "success", "message": "✅ Conexión a BD exitosa"}),
-            status_code=200,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
-    else:
-        return func.HttpResponse(
-            json.dumps({"status": "error", "message": "❌ No se pudo conectar a BD"}),
-            status_code=500,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
+@instrumentar('test')
+async def test_connection(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        await almacen.ping()
+        return respuesta_json(req, {"status": "success", "message": "✅ Conexión a BD exitosa"})
+    except ErrorConexion:
+        return respuesta_json(req, {"status": "error", "message": "❌ No se pudo conectar a BD"}, status_code=500)
 
 @app.route(route="subir", methods=["POST", "OPTIONS"])
-def subir_archivo(req: func.HttpRequest) -> func.HttpResponse:
+@instrumentar('subir')
+async def subir_archivo(req: func.HttpRequest) -> func.HttpResponse:
+    # Parseo del CSV y escrituras por lotes son bloqueantes: fuera del event loop
+    # to_thread conserva el contexto de la petición (tiempos por fase)
+    return await asyncio.to_thread(procesar_subida, req)
+
+def procesar_subida(req: func.HttpRequest) -> func.HttpResponse:
     if req.method == "OPTIONS":
-        return func.HttpResponse(
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "POST, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type"
-            }
-        )
+        return respuesta_vacia(200, {
+            "Access-Control-Allow-Methods": "POST, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type"
+        })
     
     try:
         if not req.files:
-            return func.HttpResponse(
-                json.dumps({"error": "No se recibió ningún archivo"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
+            return respuesta_json(req, {"error": "No se recibió ningún archivo"}, status_code=400)
         
         file = req.files.get('archivo')
         usuario = req.form.get('usuario', 'Anónimo')
         
         if not file or not file.filename:
-            return func.HttpResponse(
-                json.dumps({"error": "No se proporcionó un archivo válido"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
+            return respuesta_json(req, {"error": "No se proporcionó un archivo válido"}, status_code=400)
         
-        if not file.filename.lower().endswith('.csv'):
-            return func.HttpResponse(
-                json.dumps({"error": "Solo se permiten archivos CSV"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-        
-        file_content = file.read()
-        
-        # Procesar CSV
+        # Rechazar extensiones no soportadas antes de leer el archivo
         try:
-            content_str = file_content.decode('utf-8')
-            reader = csv.DictReader(io.StringIO(content_str))
-            
-            elementos_procesados = []
-            for row in reader:
-                try:
-                    dia = int(row['Día']) if row['Día'].strip() else 1
-                except:
-                    dia = 1
-                    
-                mes = row['Mes'] if row['Mes'].strip() else 'Enero'
-                
-                try:
-                    ano = int(row['Año']) if row['Año'].strip() else 2024
-                except:
-                    ano = 2024
-                    
-                try:
-                    numero_publicacion = int(row['N° Publicación']) if row['N° Publicación'].strip() else 1
-                except:
-                    numero_publicacion = 1
-                    
-                tipo_contenido = row['Tipo'].strip().upper()
-                contenido = row['Contenido / URL'].strip()
-                estilo = row.get('Estilo', '').strip()
-                
-                elemento = {
-                    'dia': dia,
-                    'mes': mes,
-                    'ano': ano,
-                    'numero_publicacion': numero_publicacion,
-                    'tipo_contenido': tipo_contenido,
-                    'contenido': contenido,
-                    'estilo': estilo
-                }
-                elementos_procesados.append(elemento)
-            
-        except Exception as e:
-            return func.HttpResponse(
-                json.dumps({"error": f"Error procesando CSV: {str(e)}"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
+            comprobar_extension(file.filename)
+        except ErrorArchivo as e:
+            return respuesta_json(req, {"error": str(e)}, status_code=400)
         
-        if not elementos_procesados:
-            return func.HttpResponse(
-                json.dumps({"error": "El archivo CSV está vacío o no contiene datos válidos"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
+        # Un archivo idéntico a la última carga no cambia nada: responder sin parsearlo
+        huella = huella_archivo(file.stream)
+        try:
+            with almacen.conexion() as conn:
+                identica = carga_identica(conn, huella)
+        except ErrorConexion:
+            return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
+        if identica:
+            registro_id, cantidad = identica
+            return respuesta_json(req, {
+                "success": True,
+                "duplicado": True,
+                "registro_id": registro_id,
+                "mensaje": f"El archivo es idéntico a la última carga (#{registro_id}); no hay cambios.",
+                "elementos_procesados": cantidad,
+                "insertados": 0,
+                "actualizados": 0,
+                "sin_cambios": cantidad,
+                "eliminados": 0,
+                # Misma forma que una carga: ningún elemento pasó por la ingesta
+                "tipos_contenido": {tipo: 0 for tipo in TIPOS_CONTENIDO},
+                "ingesta": None
+            })
         
-        # Asegurar que las tablas existen antes de guardar
-        initialize_tables()
+        parametros = {
+            'tamano_lote': req.params.get('tamano_lote') or req.form.get('tamano_lote'),
+            'metodo': req.params.get('metodo') or req.form.get('metodo'),
+        }
         
-        conn = get_db_connection()
-        if not conn:
-            return func.HttpResponse(
-                json.dumps({"error": "No se pudo conectar a la base de datos"}),
-                status_code=500,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
+        # Archivos grandes (o ?modo=async): guardar, encolar y responder 202 sin esperar la ingesta
+        modo = req.params.get('modo') or req.form.get('modo')
+        if modo == 'async' or (modo != 'sync' and tamano_flujo(file.stream) >= SUBIDA_ASINCRONA_BYTES):
+            return encolar_subida(req, file, usuario, huella, parametros)
         
+        # Validar el archivo completo antes de escribir nada: cualquier fila inválida rechaza la carga.
+        # Los bloques convertidos quedan en un temporal y la ingesta no vuelve a parsear el archivo
         try:
-            cursor = conn.cursor()
-            
-            # Insertar registro principal
-            cursor.execute('''
-                INSERT INTO registros_actualizacion 
-                (nombre_archivo, usuario, cantidad_registros, fecha_actualizacion)
-                VALUES (%s, %s, %s, NOW())
-            ''', (file.filename, usuario, len(elementos_procesados)))
-            
-            registro_id = cursor.lastrowid
-            
-            # Insertar cada elemento del contenido
-            for elemento in elementos_procesados:
-                cursor.execute('''
-                    INSERT INTO blog_contenido 
-                    (registro_id, dia, mes, ano, numero_publicacion, tipo_contenido, contenido, estilo)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (
-                    registro_id,
-                    elemento['dia'],
-                    elemento['mes'],
-                    elemento['ano'],
-                    elemento['numero_publicacion'],
-                    elemento['tipo_contenido'],
-                    elemento['contenido'],
-                    elemento['estilo']
-                ))
-            
-            conn.commit()
-            
-            # Contar tipos de contenido
-            tipos = {'T': 0, 'ST': 0, 'P': 0, 'I': 0}
-            for elemento in elementos_procesados:
-                if elemento['tipo_contenido'] in tipos:
-                    tipos[elemento['tipo_contenido']] += 1
-            
-            return func.HttpResponse(
-                json.dumps({
-                    "success": True,
-                    "registro_id": registro_id,
-                    "mensaje": f"Archivo procesado exitosamente. {len(elementos_procesados)} elementos cargados.",
-                    "elementos_procesados": len(elementos_procesados),
-                    "tipos_contenido": tipos
-                }),
-                status_code=200,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-            
-        except Exception as e:
-            conn.rollback()
-            logging.error(f"Error en transacción BD: {str(e)}")
-            return func.HttpResponse(
-                json.dumps({"error": f"Error al guardar en base de datos: {str(e)}"}),
-                status_code=500,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-        finally:
-            if conn.is_connected():
-                cursor.close()
-                conn.close()
+            with fase('validacion'):
+                validado = validar_archivo(file.filename, file.stream)
+        except ErrorArchivo as e:
+            return respuesta_json(req, {"error": f"Error procesando archivo: {str(e)}"}, status_code=400)
+
+        with validado:
+            informe = validado.informe
+            if not informe.valido:
+                return respuesta_json(req, {
+                    "error": f"Error procesando archivo: {informe.mensaje()}",
+                    "validacion": informe.resumen()
+                }, status_code=400)
+
+            if not informe.filas:
+                return respuesta_json(req, {"error": "El archivo está vacío o no contiene datos válidos"},
+                                      status_code=400)
+
+            # Los elementos validados van directo a la inserción por lotes
+            try:
+                with almacen.conexion() as conn:
+                    cuerpo = ingerir(conn, file.filename, usuario, validado.elementos(), huella, **parametros)
+
+            except ErrorConexion:
+                return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
+            except Exception as e:
+                # El pool deshace la transacción abierta al devolver la conexión
+                logging.error(f"Error en transacción BD: {str(e)}")
+                return respuesta_json(req, {"error": f"Error al guardar en base de datos: {str(e)}"},
+                                      status_code=500)
+            finally:
+                # Los lotes se confirman por separado: invalidar aunque la carga falle
+                invalidar_caches()
+
+        return respuesta_json(req, cuerpo)
                 
     except Exception as e:
         logging.error(f"Error en /subir: {str(e)}")
-        return func.HttpResponse(
-            json.dumps({"error": f"Error del servidor: {str(e)}"}),
-            status_code=500,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
+        return respuesta_json(req, {"error": f"Error del servidor: {str(e)}"}, status_code=500)
+
+def ingerir(conn, nombre_archivo, usuario, elementos, huella, tamano_lote=None, metodo=None,
+            registro_id=None, progreso=None, recontar=False):
+    """Aplicar una carga ya validada y materializar sus publicaciones.
+    
+    Común a la subida síncrona y a los trabajos en segundo plano; devuelve
+    el cuerpo de la respuesta de /subir.
+    """
+    # Contar tipos de contenido sobre la marcha
+    tipos = {tipo: 0 for tipo in TIPOS_CONTENIDO}
+    
+    # Insertar registro principal y elementos en lotes multi-fila
+    registro_id, resultado = registrar_carga(
+        conn,
+        nombre_archivo,
+        usuario,
+        contar_tipos(elementos, tipos),
+        tamano_lote=tamano_lote,
+        metodo=metodo,
+        huella=huella,
+        dialecto=almacen.dialecto,
+        registro_id=registro_id,
+        progreso=progreso,
+        recontar=recontar
+    )
+    # Reagrupar sólo las publicaciones que cambiaron para que /blog no agrupe en cada lectura
+    with fase('materializacion'):
+        materializar_publicaciones(conn, registro_id, resultado.claves_modificadas(), almacen.dialecto)
+    
+    return {
+        "success": True,
+        "registro_id": registro_id,
+        "duplicado": False,
+        "mensaje": (
+            f"Archivo procesado exitosamente. {resultado.filas} elementos: "
+            f"{resultado.insertados} nuevos, {resultado.actualizados} actualizados, "
+            f"{resultado.sin_cambios} sin cambios."
+        ),
+        "elementos_procesados": resultado.filas,
+        "insertados": resultado.insertados,
+        "actualizados": resultado.actualizados,
+        "sin_cambios": resultado.sin_cambios,
+        "eliminados": resultado.eliminados,
+        "tipos_contenido": tipos,
+        "ingesta": resultado.resumen()
+    }
+
+def encolar_subida(req, file, usuario, huella, parametros):
+    """Guardar el archivo como trabajo de ingesta y responder 202 con su estado"""
+    try:
+        with almacen.conexion() as conn:
+            trabajo_id, registro_id = crear_trabajo(conn, file.filename, usuario, huella, file.stream, parametros)
+    except ErrorConexion:
+        return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
+    
+    try:
+        get_cola(procesar_trabajo).encolar(trabajo_id)
+    except Exception as e:
+        logging.error(f"Error encolando el trabajo {trabajo_id}: {str(e)}")
+        with almacen.conexion() as conn:
+            finalizar_trabajo(conn, trabajo_id, error=f"No se pudo encolar: {str(e)}")
+        return respuesta_json(req, {"error": "No se pudo encolar el archivo para procesarlo"}, status_code=500)
+    finally:
+        # El registro ya aparece en el historial
+        invalidar_caches()
+    
+    estado_url = f"/api/subir/{trabajo_id}"
+    return respuesta_json(req, {
+        "success": True,
+        "trabajo_id": trabajo_id,
+        "registro_id": registro_id,
+        "estado": "pendiente",
+        "estado_url": estado_url,
+        "mensaje": f"Archivo recibido; se procesará en segundo plano (trabajo {trabajo_id})."
+    }, status_code=202, headers={"Location": estado_url})
+
+def procesar_trabajo(trabajo_id):
+    """Consumidor de la cola: ingerir el archivo guardado de un trabajo y cerrarlo"""
+    with almacen.conexion() as conn:
+        trabajo = reclamar_trabajo(conn, trabajo_id)
+        if trabajo is None:
+            logging.warning(f"⚠️ Trabajo {trabajo_id} inexistente o ya procesado")
+            return
+        
+        with en_curso(trabajo) as progreso:
+            try:
+                with archivo_trabajo(conn, trabajo_id) as archivo:
+                    validado = validar_archivo(trabajo['nombre_archivo'], archivo)
+                with validado:
+                    if not validado.informe.valido:
+                        raise ErrorValidacion(validado.informe)
+                    if not validado.informe.filas:
+                        raise ErrorArchivo("El archivo está vacío o no contiene datos válidos")
+                    cuerpo = ingerir(
+                        conn, trabajo['nombre_archivo'], trabajo['usuario'],
+                        validado.elementos(), trabajo['huella'],
+                        registro_id=trabajo['registro_id'],
+                        progreso=lambda filas: progreso.anotar(conn, filas),
+                        recontar=trabajo['reintento'],
+                        **trabajo['parametros']
+                    )
+            except ErrorValidacion as e:
+                # El informe por fila queda como resultado del trabajo
+                finalizar_trabajo(conn, trabajo_id, resultado={"validacion": e.informe.resumen()},
+                                  error=f"Error procesando archivo: {str(e)}", progreso=progreso)
+            except ErrorArchivo as e:
+                finalizar_trabajo(conn, trabajo_id, error=f"Error procesando archivo: {str(e)}", progreso=progreso)
+            except Exception as e:
+                logging.error(f"Error en el trabajo {trabajo_id}: {str(e)}")
+                finalizar_trabajo(conn, trabajo_id, error=f"Error al guardar en base de datos: {str(e)}",
+                                  progreso=progreso)
+            else:
+                finalizar_trabajo(conn, trabajo_id, resultado=cuerpo, progreso=progreso)
+            finally:
+                invalidar_caches()
+        logging.info(f"✅ Trabajo {trabajo_id} terminado")
+
+if BACKEND_COLA == 'azure':
+    @app.queue_trigger(arg_name="mensaje", queue_name=NOMBRE_COLA, connection="AzureWebJobsStorage")
+    async def procesar_cola_ingesta(mensaje: func.QueueMessage) -> None:
+        await asyncio.to_thread(procesar_trabajo, mensaje.get_body().decode('utf-8'))
+
+@app.route(route="subir/{trabajo_id}", methods=["GET"])
+@instrumentar('subir-estado')
+async def estado_subida(req: func.HttpRequest) -> func.HttpResponse:
+    """Estado de una subida en segundo plano: filas procesadas, filas/s, error y resultado"""
+    trabajo_id = req.route_params.get('trabajo_id')
+    try:
+        # Un trabajo que corre en esta instancia se lee de memoria, sin esperar a la BD
+        trabajo = progreso_local(trabajo_id)
+        if trabajo is None:
+            trabajo = await asyncio.to_thread(consultar_trabajo, trabajo_id)
+        if trabajo is None:
+            return respuesta_json(req, {"error": f"Trabajo {trabajo_id} no encontrado"}, status_code=404)
+        return respuesta_json(req, trabajo, headers={"Cache-Control": "no-store"})
+    except ErrorConexion:
+        return respuesta_json(req, {"error": "No se pudo conectar a la base de datos"}, status_code=500)
+    except Exception as e:
+        logging.error(f"Error en /subir/{trabajo_id}: {str(e)}")
+        return respuesta_json(req, {"error": f"Error del servidor: {str(e)}"}, status_code=500)
+
+def consultar_trabajo(trabajo_id):
+    with almacen.conexion() as conn:
+        return leer_trabajo(conn, trabajo_id)
 
 @app.route(route="reset-tables", methods=["GET"])
-def reset_tables(req: func.HttpRequest) -> func.HttpResponse:
+@instrumentar('reset-tables')
+async def reset_tables(req: func.HttpRequest) -> func.HttpResponse:
     """Endpoint para RESETEAR tablas completamente - VERSIÓN SEGURA"""
+    return await asyncio.to_thread(resetear_tablas, req)
+
+def resetear_tablas(req: func.HttpRequest) -> func.HttpResponse:
     try:
-        conn = get_db_connection()
-        if not conn:
-            return func.HttpResponse(
-                json.dumps({"error": "No hay conexión a BD"}),
-                status_code=500,
-                mimetype="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-        
-        cursor = conn.cursor()
+        almacen.reiniciar_esquema()
+        invalidar_caches()
         
-        # Deshabilitar verificación de claves foráneas temporalmente
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
-        
-        # Eliminar tablas si existen (de forma segura)
-        cursor.execute("DROP TABLE IF EXISTS blog_contenido")
-        cursor.execute("DROP TABLE IF EXISTS registros_actualizacion")
-        
-        # Habilitar verificación de claves foráneas
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
-        
-        # Crear tabla de registros
-        cursor.execute('''
-            CREATE TABLE registros_actualizacion (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                nombre_archivo VARCHAR(255) NOT NULL,
-                usuario VARCHAR(100) DEFAULT 'Anonimo',
-                fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                cantidad_registros INT DEFAULT 0
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        ''')
-        
-        # Crear tabla de contenido
-        cursor.execute('''
-            CREATE TABLE blog_contenido (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                registro_id INT,
-                dia INT,
-                mes VARCHAR(50),
-                ano INT,
-                numero_publicacion INT,
-                tipo_contenido VARCHAR(10),
-                contenido TEXT,
-                estilo TEXT,
-                fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        ''')
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return func.HttpResponse(
-            json.dumps({
-                "success": True, 
-                "message": "✅ Tablas reseteadas y recreadas exitosamente"
-            }),
-            status_code=200,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
+        return respuesta_json(req, {
+            "success": True, 
+            "message": "✅ Tablas reseteadas y recreadas exitosamente"
+        })
         
+    except ErrorConexion:
+        return respuesta_json(req, {"error": "No hay conexión a BD"}, status_code=500)
     except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
-            mimetype="application/json",
-            headers={"Access-Control-Allow-Origin": "*"}
-        )
\ No newline at end of file
+        return respuesta_json(req, {"error": str(e)}, status_code=500)
\ No newline at end of file
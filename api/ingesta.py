@@ -0,0 +1,603 @@
+import csv
+import hashlib
+import io
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import time
+import zipfile
+from itertools import islice
+
+from estilos import internar_estilos
+from metricas import contar_filas, fase, medir_iteracion
+from publicaciones import PUBLICACIONES_POR_LOTE, condicion_claves, materializar_claves, normalizar_clave
+from validacion import (
+    FILAS_POR_BLOQUE,
+    ErrorArchivo,
+    InformeValidacion,
+    elementos_bloque,
+    validar_bloques,
+)
+
+# Parámetros de la carga masiva (ajustables por entorno o por petición)
+TAMANO_LOTE = int(os.environ.get('INGESTA_TAMANO_LOTE', '1000'))
+METODO = os.environ.get('INGESTA_METODO', 'multi')
+# Límite aproximado de bytes por sentencia para no superar max_allowed_packet
+MAX_BYTES_LOTE = int(os.environ.get('INGESTA_MAX_BYTES_LOTE', str(4 * 1024 * 1024)))
+
+METODOS = ('multi', 'executemany', 'infile')
+
+# `ordinal` es la posición del elemento dentro de su publicación en el archivo.
+# El estilo se guarda una vez en blog_estilos y cada elemento lo referencia por id
+COLUMNAS_CONTENIDO = (
+    'registro_id', 'dia', 'mes', 'ano', 'numero_publicacion',
+    'tipo_contenido', 'contenido', 'estilo_id', 'ordinal', 'fecha_publicacion'
+)
+
+SQL_INSERT_CONTENIDO = (
+    f"INSERT INTO blog_contenido ({', '.join(COLUMNAS_CONTENIDO)}) VALUES "
+)
+MARCADORES_FILA = '(' + ', '.join(['%s'] * len(COLUMNAS_CONTENIDO)) + ')'
+
+# Filas por lote como máximo: una sentencia multi-fila lleva un parámetro por
+# columna y SQLite admite hasta 32766 (SQLITE_MAX_VARIABLE_NUMBER desde 3.32)
+MAX_TAMANO_LOTE = {
+    'mysql': 50000,
+    'sqlite': 32766 // len(COLUMNAS_CONTENIDO),
+}
+
+# Elementos cambiados: upsert sobre uq_contenido_elemento (publicación, ordinal)
+SQL_ACTUALIZAR_CONTENIDO = {
+    'mysql': '''
+        ON DUPLICATE KEY UPDATE
+            registro_id = VALUES(registro_id),
+            tipo_contenido = VALUES(tipo_contenido),
+            contenido = VALUES(contenido),
+            estilo_id = VALUES(estilo_id)
+    ''',
+    'sqlite': '''
+        ON CONFLICT (ano, mes, dia, numero_publicacion, ordinal) DO UPDATE SET
+            registro_id = excluded.registro_id,
+            tipo_contenido = excluded.tipo_contenido,
+            contenido = excluded.contenido,
+            estilo_id = excluded.estilo_id
+    ''',
+}
+
+TAMANO_BLOQUE_HUELLA = 1024 * 1024
+
+# Recuento completo: sólo al cerrar un trabajo reclamado tras un intento interrumpido
+SQL_RECONTAR_ELEMENTOS = (
+    "UPDATE blog_contadores SET valor = (SELECT COUNT(*) FROM blog_contenido) WHERE clave = 'total_elementos'"
+)
+
+
+class _Publicacion:
+    """Lo que la carga recuerda de cada publicación del archivo hasta terminar"""
+
+    __slots__ = ('mes', 'elementos', 'previos', 'modificada')
+
+    def __init__(self, mes):
+        # Sólo el mes cambia al normalizar la clave: se guarda como llegó en el archivo
+        self.mes = mes
+        self.elementos = 0
+        self.previos = 0
+        self.modificada = False
+
+
+def _clave_archivo(normalizada, publicacion):
+    """Clave de la publicación con el mes escrito como en el archivo"""
+    ano, _, dia, numero_publicacion = normalizada
+    return (ano, publicacion.mes, dia, numero_publicacion)
+
+
+class ResultadoIngesta:
+    """Estadísticas de una carga masiva"""
+
+    def __init__(self, metodo, tamano_lote):
+        self.metodo = metodo
+        self.tamano_lote = tamano_lote
+        self.filas = 0
+        self.lotes = 0
+        self.segundos = 0.0
+        self.insertados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.eliminados = 0
+        self.estilos_nuevos = 0
+        # Publicaciones del archivo por clave normalizada: un único registro por
+        # publicación para que la memoria de cargas muy grandes siga acotada
+        self.publicaciones = {}
+
+    def claves_modificadas(self):
+        """Claves de las publicaciones con algún elemento escrito o eliminado"""
+        return [_clave_archivo(clave, p) for clave, p in self.publicaciones.items() if p.modificada]
+
+    def resumen(self):
+        filas_por_segundo = self.filas / self.segundos if self.segundos > 0 else None
+        return {
+            "metodo": self.metodo,
+            "tamano_lote": self.tamano_lote,
+            "lotes": self.lotes,
+            "filas": self.filas,
+            "insertados": self.insertados,
+            "actualizados": self.actualizados,
+            "sin_cambios": self.sin_cambios,
+            "eliminados": self.eliminados,
+            "estilos_nuevos": self.estilos_nuevos,
+            "segundos": round(self.segundos, 4),
+            "filas_por_segundo": round(filas_por_segundo, 1) if filas_por_segundo else None
+        }
+
+
+def leer_filas_csv(flujo, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Generador de bloques de filas (listas de textos) de un flujo binario CSV.
+
+    Decodifica de forma incremental (quitando el BOM si existe) y nunca
+    mantiene más de un bloque en memoria. Las filas se toman del lector
+    de csv sin tocarlas una a una.
+    """
+    texto = io.TextIOWrapper(flujo, encoding='utf-8-sig', newline='')
+    reader = csv.reader(texto)
+    try:
+        while True:
+            bloque = list(islice(reader, filas_por_bloque))
+            if not bloque:
+                return
+            yield bloque
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ErrorArchivo(f"línea {reader.line_num}: {str(e)}") from e
+    finally:
+        # No cerrar el flujo original al liberar el envoltorio de texto
+        texto.detach()
+
+
+def _texto_celda(valor):
+    """Valor de una celda de Excel como el texto que tendría en un CSV"""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        # Excel guarda los números como float: 24.0 -> '24'
+        return str(int(valor))
+    return str(valor)
+
+
+def leer_filas_xlsx(flujo, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Generador de bloques de filas (listas de textos) de la primera hoja de un .xlsx.
+
+    El libro se abre en modo de sólo lectura: openpyxl recorre el XML de
+    la hoja fila a fila sin construir el libro completo en memoria.
+    """
+    # Dependencia opcional y cara de importar (~150 ms): se carga con el primer .xlsx
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError as e:
+        raise ErrorArchivo("El servidor no tiene soporte para Excel (openpyxl no instalado)") from e
+    try:
+        libro = load_workbook(flujo, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as e:
+        raise ErrorArchivo(f"El archivo no es un Excel (.xlsx) válido: {str(e)}") from e
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        numero = 0
+        bloque = []
+        for numero, valores in enumerate(filas, start=1):
+            bloque.append([_texto_celda(valor) for valor in valores or ()])
+            if len(bloque) == filas_por_bloque:
+                yield bloque
+                bloque = []
+        if bloque:
+            yield bloque
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        raise ErrorArchivo(f"fila {numero}: {str(e)}") from e
+    finally:
+        # En modo de sólo lectura el zip queda abierto hasta cerrar el libro
+        libro.close()
+
+
+# Lector de filas según la extensión del archivo subido
+LECTORES = {
+    '.csv': leer_filas_csv,
+    '.xlsx': leer_filas_xlsx,
+}
+
+
+def comprobar_extension(nombre_archivo):
+    """Extensión del archivo; ErrorArchivo si no está soportada"""
+    extension = os.path.splitext(nombre_archivo.lower())[1]
+    if extension not in LECTORES:
+        raise ErrorArchivo("Solo se permiten archivos CSV o Excel (.xlsx)")
+    return extension
+
+
+def leer_filas(nombre_archivo, flujo):
+    """Elegir el lector por extensión; ErrorArchivo si no está soportada"""
+    return LECTORES[comprobar_extension(nombre_archivo)](flujo)
+
+
+class ArchivoValidado:
+    """Informe de un archivo validado y sus bloques ya convertidos.
+
+    Los bloques se guardan en un temporal durante la validación: la
+    ingesta lee de ahí elementos listos en lugar de volver a parsear y
+    validar el archivo. Como context manager, borra el temporal al salir.
+    """
+
+    def __init__(self):
+        self.informe = InformeValidacion()
+        self.bloques = 0
+        self._temporal = tempfile.TemporaryFile()
+
+    def guardar(self, convertidas):
+        pickle.dump(convertidas, self._temporal, protocol=pickle.HIGHEST_PROTOCOL)
+        self.bloques += 1
+
+    def elementos(self):
+        """Generador de elementos de blog_contenido en el orden del archivo, bloque a bloque"""
+        self._temporal.seek(0)
+        for _ in range(self.bloques):
+            yield from elementos_bloque(pickle.load(self._temporal))
+
+    def close(self):
+        self._temporal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def validar_archivo(nombre_archivo, flujo):
+    """Recorrer el archivo completo sin escribir nada en la BD y devolver su ArchivoValidado.
+
+    Tras el primer error los bloques ya no se guardan: sólo se completa
+    el informe.
+    """
+    validado = ArchivoValidado()
+    try:
+        for _, convertidas in validar_bloques(leer_filas(nombre_archivo, flujo), validado.informe):
+            if validado.informe.valido:
+                validado.guardar(convertidas)
+    except BaseException:
+        validado.close()
+        raise
+    return validado
+
+
+def contar_tipos(elementos, tipos):
+    """Contar elementos por tipo a medida que pasan hacia la base de datos"""
+    for elemento in elementos:
+        if elemento['tipo_contenido'] in tipos:
+            tipos[elemento['tipo_contenido']] += 1
+        yield elemento
+
+
+def _tamano_lote(valor, dialecto='mysql'):
+    try:
+        tamano = max(1, int(valor)) if valor else TAMANO_LOTE
+    except (TypeError, ValueError):
+        tamano = TAMANO_LOTE
+    return min(tamano, MAX_TAMANO_LOTE[dialecto])
+
+
+def huella_archivo(flujo):
+    """SHA-256 del contenido subido; deja el flujo al principio para parsearlo"""
+    huella = hashlib.sha256()
+    for bloque in iter(lambda: flujo.read(TAMANO_BLOQUE_HUELLA), b''):
+        huella.update(bloque)
+    flujo.seek(0)
+    return huella.hexdigest()
+
+
+def carga_identica(conn, huella):
+    """(id, cantidad_registros) de la última carga si tenía este mismo contenido.
+
+    Sólo se compara con la más reciente: si después se subió otro archivo,
+    repetir uno anterior puede volver a cambiar publicaciones. Una carga
+    que aún no ha terminado (cantidad_registros = 0) no cuenta: sus datos
+    todavía no están completos.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT id, cantidad_registros, huella FROM registros_actualizacion ORDER BY id DESC LIMIT 1"
+        )
+        ultima = cursor.fetchone()
+    finally:
+        cursor.close()
+    if ultima and ultima[1] and ultima[2] == huella:
+        return ultima[0], ultima[1]
+    return None
+
+
+def fila_contenido(registro_id, elemento, ordinal):
+    """Fila de blog_contenido; el estilo va como texto hasta internarlo en su lote"""
+    return (
+        registro_id,
+        elemento['dia'],
+        elemento['mes'],
+        elemento['ano'],
+        elemento['numero_publicacion'],
+        elemento['tipo_contenido'],
+        elemento['contenido'],
+        elemento['estilo'],
+        ordinal,
+        elemento['fecha_publicacion']
+    )
+
+
+def _clave_fila(fila):
+    return (fila[3], fila[2], fila[1], fila[4])
+
+
+def _filas_con_ordinal(registro_id, elementos, publicaciones):
+    """Numerar los elementos de cada publicación en el orden del archivo"""
+    for elemento in elementos:
+        clave = normalizar_clave((elemento['ano'], elemento['mes'], elemento['dia'], elemento['numero_publicacion']))
+        publicacion = publicaciones.get(clave)
+        if publicacion is None:
+            # Internado: cada bloque leído del temporal trae sus propias cadenas
+            publicacion = publicaciones[clave] = _Publicacion(sys.intern(elemento['mes']))
+        publicacion.elementos += 1
+        yield fila_contenido(registro_id, elemento, publicacion.elementos - 1)
+
+
+def _lotes(filas, tamano_lote):
+    """Agrupar filas en lotes de tamaño y bytes acotados"""
+    iterador = iter(filas)
+    while True:
+        lote = []
+        bytes_lote = 0
+        for fila in islice(iterador, tamano_lote):
+            lote.append(fila)
+            bytes_lote += len(fila[6] or '') + len(fila[7] or '')
+            if bytes_lote >= MAX_BYTES_LOTE:
+                break
+        if not lote:
+            return
+        yield lote
+
+
+def _existentes(cursor, lote, publicaciones):
+    """Contenido guardado de las publicaciones del lote, por (clave normalizada, ordinal).
+
+    Anota en cada publicación cuántos elementos tenía guardados, para
+    eliminar después los que el archivo ya no trae.
+    """
+    claves = list({normalizar_clave(_clave_fila(fila)): _clave_fila(fila) for fila in lote}.values())
+    existentes = {}
+    # Un lote de publicaciones de un solo elemento tendría un OR por fila: se consulta por tramos
+    for inicio in range(0, len(claves), PUBLICACIONES_POR_LOTE):
+        tramo = claves[inicio:inicio + PUBLICACIONES_POR_LOTE]
+        cursor.execute(f'''
+            SELECT ano, mes, dia, numero_publicacion, ordinal, tipo_contenido, contenido, estilo_id
+            FROM blog_contenido
+            WHERE {condicion_claves(len(tramo))}
+        ''', [v for clave in tramo for v in clave])
+        for ano, mes, dia, numero, ordinal, tipo_contenido, contenido, estilo_id in cursor.fetchall():
+            clave = normalizar_clave((ano, mes, dia, numero))
+            existentes[(clave, ordinal)] = (tipo_contenido, contenido, estilo_id)
+            publicacion = publicaciones.get(clave)
+            if publicacion is not None:
+                publicacion.previos = max(publicacion.previos, ordinal + 1)
+    return existentes
+
+
+def _actualizar(cursor, lote, dialecto):
+    sql = SQL_INSERT_CONTENIDO + ', '.join([MARCADORES_FILA] * len(lote)) + SQL_ACTUALIZAR_CONTENIDO[dialecto]
+    cursor.execute(sql, [valor for fila in lote for valor in fila])
+
+
+def _eliminar_sobrantes(cursor, sobrantes):
+    """Borrar los elementos con ordinal >= del nuevo total de su publicación"""
+    cursor.execute(
+        "DELETE FROM blog_contenido WHERE " + ' OR '.join(
+            ['(ano = %s AND mes = %s AND dia = %s AND numero_publicacion = %s AND ordinal >= %s)'] * len(sobrantes)
+        ),
+        [v for clave, total in sobrantes for v in clave + (total,)]
+    )
+    return cursor.rowcount
+
+
+def _insertar_multi(cursor, lote):
+    sql = SQL_INSERT_CONTENIDO + ', '.join([MARCADORES_FILA] * len(lote))
+    cursor.execute(sql, [valor for fila in lote for valor in fila])
+
+
+def _insertar_executemany(cursor, lote):
+    # mysql-connector reescribe executemany de un INSERT simple como multi-fila
+    cursor.executemany(SQL_INSERT_CONTENIDO + MARCADORES_FILA, lote)
+
+
+def _escapar_tsv(valor):
+    if valor is None:
+        return '\\N'
+    return (str(valor)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def _insertar_infile(cursor, lote):
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv',
+                                     delete=False) as tmp:
+        for fila in lote:
+            tmp.write('\t'.join(_escapar_tsv(v) for v in fila))
+            tmp.write('\n')
+        ruta = tmp.name
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE blog_contenido "
+            f"CHARACTER SET utf8mb4 ({', '.join(COLUMNAS_CONTENIDO)})",
+            (ruta,)
+        )
+    finally:
+        os.remove(ruta)
+
+
+_INSERTORES = {
+    'multi': _insertar_multi,
+    'executemany': _insertar_executemany,
+    'infile': _insertar_infile,
+}
+
+
+def insertar_en_lotes(conn, registro_id, elementos, tamano_lote=None, metodo=None,
+                      dialecto='mysql', resultado=None, progreso=None):
+    """Aplicar los elementos a blog_contenido por lotes, confirmando cada lote.
+
+    Cada elemento se identifica por (año, mes, día, número, ordinal). Los
+    nuevos se insertan con el método elegido, los que cambiaron se
+    actualizan y los idénticos no se escriben; al final se eliminan los
+    elementos sobrantes de publicaciones que ahora son más cortas.
+    Si LOAD DATA LOCAL INFILE no está permitido por el servidor se sigue
+    con INSERT multi-fila para el resto de la carga. `progreso(filas)` se
+    llama tras confirmar cada lote.
+    """
+    tamano_lote = _tamano_lote(tamano_lote, dialecto)
+    metodo = metodo if metodo in METODOS else METODO
+    if resultado is None:
+        resultado = ResultadoIngesta(metodo, tamano_lote)
+    publicaciones = resultado.publicaciones
+    estilos = {}
+    # El parseo del archivo ocurre al pedir cada fila: se mide aparte de la inserción
+    filas = medir_iteracion(_filas_con_ordinal(registro_id, elementos, publicaciones), 'parseo')
+
+    inicio = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        for lote in _lotes(filas, tamano_lote):
+            with fase('comparacion'):
+                # Texto del estilo -> id de blog_estilos antes de comparar y escribir
+                resultado.estilos_nuevos += internar_estilos(cursor, {fila[7] for fila in lote}, estilos, dialecto)
+                lote = [fila[:7] + (estilos.get(fila[7]),) + fila[8:] for fila in lote]
+                existentes = _existentes(cursor, lote, publicaciones)
+            nuevas = []
+            cambiadas = []
+            for fila in lote:
+                clave = normalizar_clave(_clave_fila(fila))
+                actual = existentes.get((clave, fila[8]))
+                if actual is None:
+                    nuevas.append(fila)
+                elif actual != (fila[5], fila[6], fila[7]):
+                    cambiadas.append(fila)
+                else:
+                    continue
+                publicaciones[clave].modificada = True
+
+            with fase('insercion'):
+                if nuevas:
+                    try:
+                        _INSERTORES[resultado.metodo](cursor, nuevas)
+                    except Exception as e:
+                        if resultado.metodo != 'infile':
+                            raise
+                        logging.warning(f"⚠️ LOAD DATA no disponible, usando INSERT multi-fila: {str(e)}")
+                        resultado.metodo = 'multi'
+                        _insertar_multi(cursor, nuevas)
+                if cambiadas:
+                    _actualizar(cursor, cambiadas, dialecto)
+                conn.commit()
+            contar_filas(len(lote))
+            resultado.filas += len(lote)
+            resultado.lotes += 1
+            resultado.insertados += len(nuevas)
+            resultado.actualizados += len(cambiadas)
+            resultado.sin_cambios += len(lote) - len(nuevas) - len(cambiadas)
+            if progreso:
+                progreso(resultado.filas)
+
+        sobrantes = [(clave, p) for clave, p in publicaciones.items() if p.previos > p.elementos]
+        with fase('insercion'):
+            for posicion in range(0, len(sobrantes), PUBLICACIONES_POR_LOTE):
+                lote = sobrantes[posicion:posicion + PUBLICACIONES_POR_LOTE]
+                resultado.eliminados += _eliminar_sobrantes(
+                    cursor, [(_clave_archivo(clave, p), p.elementos) for clave, p in lote]
+                )
+                for _, publicacion in lote:
+                    publicacion.modificada = True
+                conn.commit()
+    finally:
+        cursor.close()
+        resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def registrar_carga(conn, nombre_archivo, usuario, elementos, tamano_lote=None, metodo=None,
+                    huella=None, dialecto='mysql', registro_id=None, progreso=None, recontar=False):
+    """Crear el registro de actualización y aplicar sus elementos por lotes.
+
+    Con `registro_id` se completa un registro ya creado (subida en segundo
+    plano) en lugar de crear uno nuevo. `recontar` indica que un intento
+    anterior de ese registro ya confirmó lotes que no llegó a contar: el
+    total de elementos se recalcula en lugar de sumar sólo lo insertado ahora.
+
+    Como cada lote se confirma por separado, si la carga falla a mitad se
+    eliminan los elementos que insertó y el propio registro; los que ya
+    había actualizado conservan el contenido nuevo, sin registro asociado,
+    y sus publicaciones se vuelven a materializar. La carga anterior deja
+    de describir lo guardado, así que pierde su huella: volver a subirla
+    se aplica de nuevo en lugar de tomarse por duplicada.
+    Devuelve (registro_id, ResultadoIngesta).
+    """
+    cursor = conn.cursor()
+    try:
+        # Los elementos insertados por esta carga tendrán un id mayor
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM blog_contenido")
+        id_previo = cursor.fetchone()[0]
+        if registro_id is None:
+            cursor.execute('''
+                INSERT INTO registros_actualizacion
+                (nombre_archivo, usuario, cantidad_registros, fecha_actualizacion, huella)
+                VALUES (%s, %s, 0, NOW(), %s)
+            ''', (nombre_archivo, usuario, huella))
+            registro_id = cursor.lastrowid
+        conn.commit()
+
+        resultado = ResultadoIngesta(metodo if metodo in METODOS else METODO, _tamano_lote(tamano_lote, dialecto))
+        try:
+            insertar_en_lotes(conn, registro_id, elementos, tamano_lote, metodo, dialecto, resultado, progreso)
+            cursor.execute(
+                "UPDATE registros_actualizacion SET cantidad_registros = %s WHERE id = %s",
+                (resultado.filas, registro_id)
+            )
+            # Mantener los contadores en la misma transacción que cierra la carga
+            if recontar:
+                cursor.execute(SQL_RECONTAR_ELEMENTOS)
+            else:
+                cursor.execute(
+                    "UPDATE blog_contadores SET valor = valor + %s WHERE clave = 'total_elementos'",
+                    (resultado.insertados - resultado.eliminados,)
+                )
+            cursor.execute("UPDATE blog_contadores SET valor = valor + 1 WHERE clave = 'total_registros'")
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+                cursor.execute(
+                    "DELETE FROM blog_contenido WHERE registro_id = %s AND id > %s",
+                    (registro_id, id_previo)
+                )
+                cursor.execute("UPDATE blog_contenido SET registro_id = NULL WHERE registro_id = %s", (registro_id,))
+                cursor.execute("DELETE FROM registros_actualizacion WHERE id = %s", (registro_id,))
+                cursor.execute("SELECT MAX(id) FROM registros_actualizacion")
+                cursor.execute(
+                    "UPDATE registros_actualizacion SET huella = NULL WHERE id = %s", (cursor.fetchone()[0],)
+                )
+                materializar_claves(cursor, None, resultado.claves_modificadas(), dialecto)
+                if recontar:
+                    # Los lotes del intento anterior se quedan, sin registro asociado
+                    cursor.execute(SQL_RECONTAR_ELEMENTOS)
+                conn.commit()
+            except Exception as e:
+                logging.error(f"❌ No se pudo limpiar la carga parcial {registro_id}: {str(e)}")
+            raise
+
+        return registro_id, resultado
+    finally:
+        cursor.close()
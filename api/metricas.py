@@ -0,0 +1,170 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites de los histogramas de duración (segundos), como los de Prometheus
+LIMITES_DURACION = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Medición de la petición en curso; asyncio.to_thread la hereda en el hilo
+_medicion_actual = contextvars.ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    """Tiempos por fase, filas y bytes de una petición"""
+
+    __slots__ = ('ruta', 'inicio', 'fases', 'filas')
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.inicio = time.perf_counter()
+        self.fases = {}
+        self.filas = 0
+
+    def sumar(self, nombre, segundos):
+        self.fases[nombre] = self.fases.get(nombre, 0.0) + segundos
+
+    def server_timing(self, total):
+        partes = [f"{nombre};dur={segundos * 1000:.2f}" for nombre, segundos in self.fases.items()]
+        partes.append(f"total;dur={total * 1000:.2f}")
+        return ', '.join(partes)
+
+
+class Histograma:
+    __slots__ = ('cubetas', 'suma', 'cuenta')
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_DURACION) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(LIMITES_DURACION, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+
+
+class RegistroMetricas:
+    """Agregados en proceso de todas las peticiones instrumentadas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duraciones = {}
+        self.peticiones = {}
+        self.filas = {}
+        self.bytes = {}
+
+    def registrar(self, medicion, total, status_code, bytes_entrada, bytes_salida):
+        ruta = medicion.ruta
+        with self._lock:
+            for nombre, segundos in list(medicion.fases.items()) + [('total', total)]:
+                histograma = self.duraciones.get((ruta, nombre))
+                if histograma is None:
+                    histograma = self.duraciones[(ruta, nombre)] = Histograma()
+                histograma.observar(segundos)
+            clave = (ruta, str(status_code))
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+            self.filas[ruta] = self.filas.get(ruta, 0) + medicion.filas
+            for direccion, cantidad in (('entrada', bytes_entrada), ('salida', bytes_salida)):
+                self.bytes[(ruta, direccion)] = self.bytes.get((ruta, direccion), 0) + cantidad
+
+    def exportar(self):
+        """Formato de texto de Prometheus (versión 0.0.4)"""
+        lineas = [
+            '# HELP blog_duracion_segundos Duración por fase de cada petición',
+            '# TYPE blog_duracion_segundos histogram',
+        ]
+        with self._lock:
+            for (ruta, fase), histograma in sorted(self.duraciones.items()):
+                etiquetas = f'ruta="{ruta}",fase="{fase}"'
+                acumulado = 0
+                for limite, cantidad in zip(LIMITES_DURACION + ('+Inf',), histograma.cubetas):
+                    acumulado += cantidad
+                    lineas.append(f'blog_duracion_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                lineas.append(f'blog_duracion_segundos_sum{{{etiquetas}}} {histograma.suma:.6f}')
+                lineas.append(f'blog_duracion_segundos_count{{{etiquetas}}} {histograma.cuenta}')
+
+            lineas += ['# HELP blog_peticiones_total Peticiones atendidas por ruta y estado',
+                       '# TYPE blog_peticiones_total counter']
+            for (ruta, status_code), cantidad in sorted(self.peticiones.items()):
+                lineas.append(f'blog_peticiones_total{{ruta="{ruta}",status="{status_code}"}} {cantidad}')
+
+            lineas += ['# HELP blog_filas_total Filas leídas o escritas en la base de datos',
+                       '# TYPE blog_filas_total counter']
+            for ruta, cantidad in sorted(self.filas.items()):
+                lineas.append(f'blog_filas_total{{ruta="{ruta}"}} {cantidad}')
+
+            lineas += ['# HELP blog_bytes_total Bytes de los cuerpos de petición y respuesta',
+                       '# TYPE blog_bytes_total counter']
+            for (ruta, direccion), cantidad in sorted(self.bytes.items()):
+                lineas.append(f'blog_bytes_total{{ruta="{ruta}",direccion="{direccion}"}} {cantidad}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro_metricas = RegistroMetricas()
+
+
+@contextmanager
+def fase(nombre):
+    """Sumar la duración del bloque a la fase `nombre` de la petición en curso"""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+
+
+def medir_iteracion(iterable, nombre):
+    """Cargar a `nombre` el tiempo de producir cada elemento (p. ej. el parseo en streaming)"""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield from iterable
+        return
+    iterador = iter(iterable)
+    while True:
+        inicio = time.perf_counter()
+        try:
+            elemento = next(iterador)
+        except StopIteration:
+            medicion.sumar(nombre, time.perf_counter() - inicio)
+            return
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+        yield elemento
+
+
+def contar_filas(cantidad):
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.filas += cantidad
+
+
+def instrumentar(ruta):
+    """Decorador de rutas async: Server-Timing en la respuesta y agregados para /metrics"""
+    def decorador(handler):
+        @functools.wraps(handler)
+        async def envoltura(req):
+            medicion = Medicion(ruta)
+            token = _medicion_actual.set(medicion)
+            status_code = 500
+            respuesta = None
+            try:
+                respuesta = await handler(req)
+                status_code = respuesta.status_code
+                return respuesta
+            finally:
+                _medicion_actual.reset(token)
+                total = time.perf_counter() - medicion.inicio
+                bytes_salida = 0
+                if respuesta is not None:
+                    respuesta.headers['Server-Timing'] = medicion.server_timing(total)
+                    bytes_salida = len(respuesta.get_body() or b'')
+                registro_metricas.registrar(medicion, total, status_code,
+                                            len(req.get_body() or b''), bytes_salida)
+        return envoltura
+    return decorador
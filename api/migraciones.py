@@ -0,0 +1,393 @@
+import logging
+import threading
+
+from base_datos import obtener_conexion
+from publicaciones import fecha_publicacion, materializar_todo
+
+# Nombre del bloqueo de MySQL que serializa las migraciones entre instancias
+NOMBRE_BLOQUEO = 'blog_rapido_express_migraciones'
+TIMEOUT_BLOQUEO = 30
+
+# Tablas gestionadas por las migraciones, en orden de borrado
+TABLAS_BLOG = ['trabajos_ingesta_partes', 'trabajos_ingesta', 'blog_contadores', 'blog_publicaciones',
+               'blog_contenido', 'blog_estilos', 'registros_actualizacion']
+
+
+def crear_indice(cursor, tabla, nombre, columnas, unico=False, texto_completo=False):
+    """Crear un índice sólo si no existe (DDL en línea, sin bloquear escrituras).
+
+    Los índices FULLTEXT no admiten LOCK=NONE: bloquean las escrituras
+    (no las lecturas) mientras se construyen.
+    """
+    cursor.execute('''
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+    ''', (tabla, nombre))
+    if cursor.fetchone():
+        return
+    if texto_completo:
+        cursor.execute(f"ALTER TABLE {tabla} ADD FULLTEXT INDEX {nombre} {columnas}, ALGORITHM=INPLACE, LOCK=SHARED")
+    else:
+        tipo = 'UNIQUE INDEX' if unico else 'INDEX'
+        cursor.execute(f"ALTER TABLE {tabla} ADD {tipo} {nombre} {columnas}, ALGORITHM=INPLACE, LOCK=NONE")
+    logging.info(f"✅ Índice {nombre} creado")
+
+
+def existe_columna(cursor, tabla, nombre):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        LIMIT 1
+    ''', (tabla, nombre))
+    return cursor.fetchone() is not None
+
+
+def crear_columna(cursor, tabla, nombre, definicion):
+    """Añadir una columna sólo si no existe"""
+    if existe_columna(cursor, tabla, nombre):
+        return
+    cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {definicion}")
+    logging.info(f"✅ Columna {tabla}.{nombre} creada")
+
+
+def _indices_paginacion(cursor):
+    crear_indice(cursor, 'blog_contenido', 'idx_contenido_fecha_id', '(fecha_creacion, id)')
+    crear_indice(cursor, 'blog_contenido', 'idx_contenido_registro', '(registro_id)')
+
+
+def _indice_publicaciones(cursor):
+    crear_indice(cursor, 'blog_contenido', 'idx_contenido_publicacion', '(ano, mes, dia, numero_publicacion, id)')
+
+
+def _indice_materializacion(cursor):
+    crear_indice(cursor, 'blog_contenido', 'idx_contenido_registro_publicacion',
+                 '(registro_id, ano, mes, dia, numero_publicacion)')
+
+
+def _columnas_huella_ordinal(cursor):
+    crear_columna(cursor, 'registros_actualizacion', 'huella', 'CHAR(64) NULL')
+    crear_columna(cursor, 'blog_contenido', 'ordinal', 'INT NOT NULL DEFAULT 0')
+
+
+def _indice_elemento(cursor):
+    crear_indice(cursor, 'blog_contenido', 'uq_contenido_elemento',
+                 '(ano, mes, dia, numero_publicacion, ordinal)', unico=True)
+
+
+def _columnas_fecha_publicacion(cursor):
+    crear_columna(cursor, 'blog_contenido', 'fecha_publicacion', 'DATE NULL')
+    crear_columna(cursor, 'blog_publicaciones', 'fecha_publicacion', 'DATE NULL')
+
+
+def _rellenar_fechas(cursor):
+    """Calcular fecha_publicacion de las filas existentes, una vez por (año, mes, día) distinto"""
+    cursor.execute("SELECT DISTINCT ano, mes, dia FROM blog_contenido WHERE fecha_publicacion IS NULL")
+    for ano, mes, dia in cursor.fetchall():
+        fecha = fecha_publicacion(ano, mes, dia)
+        if fecha is not None:
+            cursor.execute('''
+                UPDATE blog_contenido SET fecha_publicacion = %s
+                WHERE ano = %s AND mes = %s AND dia = %s AND fecha_publicacion IS NULL
+            ''', (fecha, ano, mes, dia))
+
+
+def _indice_fecha_publicacion(cursor):
+    crear_indice(cursor, 'blog_publicaciones', 'idx_publicacion_fecha_pub', '(fecha_publicacion, id)')
+
+
+def _columna_texto(cursor):
+    crear_columna(cursor, 'blog_publicaciones', 'texto', 'MEDIUMTEXT NULL')
+
+
+def _indice_texto(cursor):
+    crear_indice(cursor, 'blog_publicaciones', 'ft_publicacion_texto', '(texto)', texto_completo=True)
+
+
+def _columnas_estilo(cursor):
+    crear_columna(cursor, 'blog_contenido', 'estilo_id', 'INT NULL')
+    crear_columna(cursor, 'blog_publicaciones', 'estilos', 'TEXT NULL')
+
+
+def _columna_latido(cursor):
+    crear_columna(cursor, 'trabajos_ingesta', 'latido', 'DOUBLE NULL')
+
+
+def _internar_estilos(cursor):
+    """Pasar el estilo de cada elemento a blog_estilos y borrar la columna de texto.
+
+    La huella se calcula con SHA2 igual que estilos.huella_estilo. La
+    columna se borra al final: si existe, el paso no se completó.
+    """
+    if not existe_columna(cursor, 'blog_contenido', 'estilo'):
+        return
+    cursor.execute('''
+        INSERT INTO blog_estilos (huella, estilo)
+        SELECT SHA2(estilo, 256), MIN(estilo) FROM blog_contenido
+        WHERE estilo IS NOT NULL AND estilo <> ''
+        GROUP BY SHA2(estilo, 256)
+        ON DUPLICATE KEY UPDATE huella = huella
+    ''')
+    cursor.execute('''
+        UPDATE blog_contenido c
+        JOIN blog_estilos e ON e.huella = SHA2(c.estilo, 256)
+        SET c.estilo_id = e.id
+        WHERE c.estilo IS NOT NULL AND c.estilo <> ''
+    ''')
+    cursor.execute("ALTER TABLE blog_contenido DROP COLUMN estilo")
+    logging.info("✅ Estilos de blog_contenido pasados a blog_estilos")
+
+
+# Migraciones numeradas: cada paso es una sentencia SQL o una función(cursor).
+# Todas deben ser idempotentes para poder reanudar una migración interrumpida.
+MIGRACIONES = [
+    (1, 'Tablas base', [
+        '''
+        CREATE TABLE IF NOT EXISTS registros_actualizacion (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nombre_archivo VARCHAR(255) NOT NULL,
+            usuario VARCHAR(100) DEFAULT 'Anonimo',
+            fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            cantidad_registros INT DEFAULT 0
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS blog_contenido (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            registro_id INT,
+            dia INT,
+            mes VARCHAR(50),
+            ano INT,
+            numero_publicacion INT,
+            tipo_contenido VARCHAR(10),
+            contenido TEXT,
+            estilo TEXT,
+            fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        ''',
+    ]),
+    (2, 'Índices de paginación por cursor', [_indices_paginacion]),
+    (3, 'Publicaciones materializadas', [
+        _indice_publicaciones,
+        '''
+        CREATE TABLE IF NOT EXISTS blog_publicaciones (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            ano INT,
+            mes VARCHAR(50),
+            dia INT,
+            numero_publicacion INT,
+            registro_id INT,
+            cantidad_elementos INT DEFAULT 0,
+            documento LONGTEXT NOT NULL,
+            fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_publicacion (ano, mes, dia, numero_publicacion),
+            KEY idx_publicacion_fecha_id (fecha_actualizacion, id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        ''',
+        materializar_todo,
+    ]),
+    (4, 'Contadores mantenidos por las cargas', [
+        '''
+        CREATE TABLE IF NOT EXISTS blog_contadores (
+            clave VARCHAR(64) PRIMARY KEY,
+            valor BIGINT NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        ''',
+        # Único recuento completo: a partir de aquí los mantiene cada carga
+        "REPLACE INTO blog_contadores (clave, valor) SELECT 'total_elementos', COUNT(*) FROM blog_contenido",
+        "REPLACE INTO blog_contadores (clave, valor) SELECT 'total_registros', COUNT(*) FROM registros_actualizacion",
+    ]),
+    (5, 'Índice de materialización por carga', [_indice_materializacion]),
+    (6, 'Cargas idempotentes: huella y elementos únicos por publicación', [
+        _columnas_huella_ordinal,
+        # Cargas repetidas: conservar sólo los elementos de la carga más reciente
+        '''
+        DELETE c FROM blog_contenido c
+        JOIN (
+            SELECT ano, mes, dia, numero_publicacion, MAX(registro_id) AS registro_id
+            FROM blog_contenido
+            GROUP BY ano, mes, dia, numero_publicacion
+        ) u ON u.ano = c.ano AND u.mes = c.mes AND u.dia = c.dia
+           AND u.numero_publicacion = c.numero_publicacion
+        WHERE COALESCE(c.registro_id, 0) < u.registro_id
+        ''',
+        '''
+        UPDATE blog_contenido c
+        JOIN (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY ano, mes, dia, numero_publicacion ORDER BY id
+            ) - 1 AS ordinal
+            FROM blog_contenido
+        ) o ON o.id = c.id
+        SET c.ordinal = o.ordinal
+        ''',
+        _indice_elemento,
+        "REPLACE INTO blog_contadores (clave, valor) SELECT 'total_elementos', COUNT(*) FROM blog_contenido",
+    ]),
+    (7, 'Fecha de publicación real', [
+        _columnas_fecha_publicacion,
+        _rellenar_fechas,
+        _indice_fecha_publicacion,
+        # Rehacer las publicaciones con su fecha y los elementos ya deduplicados
+        materializar_todo,
+    ]),
+    (8, 'Búsqueda de texto completo', [
+        _columna_texto,
+        # Indexar con el texto ya relleno: construir el índice de una vez es más
+        # barato. Ambos son pasos finales, así que el índice se crea tras la
+        # última materialización pendiente aunque ésta llegue en otra migración
+        materializar_todo,
+        _indice_texto,
+    ]),
+    (9, 'Trabajos de ingesta en segundo plano', [
+        '''
+        CREATE TABLE IF NOT EXISTS trabajos_ingesta (
+            id CHAR(32) PRIMARY KEY,
+            registro_id INT NULL,
+            nombre_archivo VARCHAR(255) NOT NULL,
+            usuario VARCHAR(100),
+            huella CHAR(64),
+            parametros TEXT,
+            estado VARCHAR(16) NOT NULL DEFAULT 'pendiente',
+            bytes_archivo BIGINT NOT NULL DEFAULT 0,
+            filas_procesadas INT NOT NULL DEFAULT 0,
+            filas_por_segundo DOUBLE NULL,
+            error TEXT,
+            resultado MEDIUMTEXT,
+            fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_inicio DATETIME NULL,
+            fecha_fin DATETIME NULL,
+            KEY idx_trabajo_estado (estado, fecha_creacion)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        ''',
+        # El archivo subido, en partes menores que max_allowed_packet
+        '''
+        CREATE TABLE IF NOT EXISTS trabajos_ingesta_partes (
+            trabajo_id CHAR(32) NOT NULL,
+            parte INT NOT NULL,
+            datos MEDIUMBLOB NOT NULL,
+            PRIMARY KEY (trabajo_id, parte)
+        ) ENGINE=InnoDB
+        ''',
+    ]),
+    (10, 'Diccionario de estilos', [
+        '''
+        CREATE TABLE IF NOT EXISTS blog_estilos (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            huella CHAR(64) NOT NULL,
+            estilo TEXT NOT NULL,
+            UNIQUE KEY uq_estilo_huella (huella)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        ''',
+        _columnas_estilo,
+        _internar_estilos,
+        # Documentos con los elementos como filas y la lista de estilos de cada publicación
+        materializar_todo,
+    ]),
+    (11, 'Latido de los trabajos de ingesta', [_columna_latido]),
+]
+
+# Pasos que escriben con el esquema final: se ejecutan una sola vez, en este
+# orden, en la última migración pendiente que incluya alguno (antes faltarían
+# columnas, y el índice de texto se construiría sobre texto aún por rellenar)
+PASOS_FINALES = (materializar_todo, _indice_texto)
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def _version_aplicada(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS esquema_version (
+            version INT PRIMARY KEY,
+            descripcion VARCHAR(255),
+            fecha_aplicacion DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    ''')
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM esquema_version")
+    return cursor.fetchone()[0]
+
+
+def aplicar_migraciones(conn):
+    """Aplicar las migraciones pendientes bajo un bloqueo con nombre.
+
+    Devuelve la lista de versiones aplicadas en esta llamada.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (NOMBRE_BLOQUEO, TIMEOUT_BLOQUEO))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("No se obtuvo el bloqueo de migraciones")
+        try:
+            actual = _version_aplicada(cursor)
+            aplicadas = []
+            pendientes = [migracion for migracion in MIGRACIONES if migracion[0] > actual]
+            finales = {paso for _, _, pasos in pendientes for paso in pasos if paso in PASOS_FINALES}
+            ultima_final = max(
+                (version for version, _, pasos in pendientes if finales.intersection(pasos)), default=None
+            )
+            for version, descripcion, pasos in pendientes:
+                for paso in pasos:
+                    if paso in PASOS_FINALES:
+                        if version == ultima_final:
+                            for final in PASOS_FINALES:
+                                if final in finales:
+                                    final(cursor)
+                            finales.clear()
+                        continue
+                    if callable(paso):
+                        paso(cursor)
+                    else:
+                        cursor.execute(paso)
+                cursor.execute(
+                    "INSERT INTO esquema_version (version, descripcion) VALUES (%s, %s)",
+                    (version, descripcion)
+                )
+                conn.commit()
+                aplicadas.append(version)
+                logging.info(f"✅ Migración {version} aplicada: {descripcion}")
+            return aplicadas
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (NOMBRE_BLOQUEO,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+_esquema_al_dia = False
+_esquema_lock = threading.Lock()
+
+
+def asegurar_esquema():
+    """Garantizar que el esquema está al día; tras el primer éxito no toca la BD"""
+    global _esquema_al_dia
+    if _esquema_al_dia:
+        return True
+    with _esquema_lock:
+        if _esquema_al_dia:
+            return True
+        try:
+            with obtener_conexion() as conn:
+                aplicar_migraciones(conn)
+            _esquema_al_dia = True
+            logging.info(f"✅ Esquema en la versión {VERSION_ACTUAL}")
+        except Exception as e:
+            logging.error(f"❌ Error aplicando migraciones: {str(e)}")
+    return _esquema_al_dia
+
+
+def reiniciar_esquema(conn):
+    """Borrar todas las tablas del blog y recrearlas desde la migración 1"""
+    global _esquema_al_dia
+    with _esquema_lock:
+        _esquema_al_dia = False
+        cursor = conn.cursor()
+        try:
+            # Deshabilitar verificación de claves foráneas temporalmente
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+            for tabla in TABLAS_BLOG + ['esquema_version']:
+                cursor.execute(f"DROP TABLE IF EXISTS {tabla}")
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        finally:
+            cursor.close()
+        aplicar_migraciones(conn)
+        _esquema_al_dia = True
@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import date, datetime, timedelta
+
+from publicaciones import numero_mes
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+class ErrorPaginacion(ValueError):
+    """Cursor o límite de paginación mal formado"""
+
+
+def codificar_cursor(*valores):
+    """Cursor opaco a partir de la clave de ordenación de la última fila"""
+    crudo = json.dumps(
+        [v.isoformat() if isinstance(v, date) else v for v in valores],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(crudo.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, *tipos):
+    """Recuperar la clave de un cursor; `tipos` indica cómo convertir cada valor"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(tipos):
+            raise ValueError("longitud incorrecta")
+        return tuple(
+            tipo.fromisoformat(v) if tipo in (date, datetime) else tipo(v)
+            for tipo, v in zip(tipos, valores)
+        )
+    except (ValueError, TypeError) as e:
+        raise ErrorPaginacion(f"Cursor inválido: {cursor}") from e
+
+
+def leer_limite(valor, defecto=LIMITE_POR_DEFECTO, maximo=LIMITE_MAXIMO):
+    if not valor:
+        return defecto
+    try:
+        limite = int(valor)
+    except ValueError as e:
+        raise ErrorPaginacion(f"Límite inválido: {valor}") from e
+    return min(max(limite, 1), maximo)
+
+
+def _leer_fecha(valor, nombre):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError as e:
+        raise ErrorPaginacion(f"{nombre} debe tener el formato AAAA-MM-DD: {valor}") from e
+
+
+def leer_rango_fechas(desde=None, hasta=None, ano=None, mes=None):
+    """Rango cerrado (inicio, fin) de fechas de publicación a partir de los filtros.
+
+    `ano` y `mes` delimitan un archivo anual o mensual y se combinan con
+    `desde`/`hasta`. Devuelve None si no hay ningún filtro; un extremo
+    None significa rango abierto por ese lado.
+    """
+    inicio = _leer_fecha(desde, 'desde') if desde else None
+    fin = _leer_fecha(hasta, 'hasta') if hasta else None
+    if mes and not ano:
+        raise ErrorPaginacion("El filtro mes requiere también ano")
+    if ano:
+        try:
+            ano = int(ano)
+            numero = numero_mes(mes) if mes else None
+            if mes and numero is None:
+                raise ValueError(mes)
+            archivo_inicio = date(ano, numero or 1, 1)
+            archivo_fin = (date(ano + 1, 1, 1) if not numero or numero == 12
+                           else date(ano, numero + 1, 1)) - timedelta(days=1)
+        except (ValueError, OverflowError) as e:
+            raise ErrorPaginacion(f"Año o mes inválido: {ano} {mes or ''}".rstrip()) from e
+        inicio = max(inicio, archivo_inicio) if inicio else archivo_inicio
+        fin = min(fin, archivo_fin) if fin else archivo_fin
+    if inicio is None and fin is None:
+        return None
+    return inicio, fin
@@ -0,0 +1,183 @@
+import json
+import sys
+from datetime import date
+
+from busqueda import texto_publicacion
+from estilos import lista_estilos
+
+# Publicaciones reconstruidas por consulta (acota la memoria de la materialización)
+PUBLICACIONES_POR_LOTE = 100
+
+COLUMNAS_CLAVE = ('ano', 'mes', 'dia', 'numero_publicacion')
+
+# Nombres de mes usados en los archivos (también se aceptan números 1-12)
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+    'noviembre': 11, 'diciembre': 12,
+}
+
+_INSERT_PUBLICACION = '''
+    INSERT INTO blog_publicaciones
+    (ano, mes, dia, numero_publicacion, registro_id, cantidad_elementos, documento,
+     estilos, fecha_publicacion, texto, fecha_actualizacion)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+'''
+
+# Upsert por (año, mes, día, número) en cada dialecto soportado
+SQL_MATERIALIZAR = {
+    'mysql': _INSERT_PUBLICACION + '''
+    ON DUPLICATE KEY UPDATE
+        registro_id = VALUES(registro_id),
+        cantidad_elementos = VALUES(cantidad_elementos),
+        documento = VALUES(documento),
+        estilos = VALUES(estilos),
+        fecha_publicacion = VALUES(fecha_publicacion),
+        texto = VALUES(texto),
+        fecha_actualizacion = VALUES(fecha_actualizacion)
+''',
+    'sqlite': _INSERT_PUBLICACION + '''
+    ON CONFLICT (ano, mes, dia, numero_publicacion) DO UPDATE SET
+        registro_id = excluded.registro_id,
+        cantidad_elementos = excluded.cantidad_elementos,
+        documento = excluded.documento,
+        estilos = excluded.estilos,
+        fecha_publicacion = excluded.fecha_publicacion,
+        texto = excluded.texto,
+        fecha_actualizacion = excluded.fecha_actualizacion
+''',
+}
+
+
+def numero_mes(mes):
+    """Mes 1-12 a partir de 'Octubre', 'octubre ' o '10'; None si no se reconoce"""
+    texto = str(mes or '').strip().casefold()
+    if texto.isdigit():
+        numero = int(texto)
+        return numero if 1 <= numero <= 12 else None
+    return MESES.get(texto)
+
+
+def fecha_publicacion(ano, mes, dia):
+    """Fecha real de una publicación; None si día, mes y año no forman una fecha"""
+    numero = numero_mes(mes)
+    if numero is None:
+        return None
+    try:
+        return date(ano, numero, dia)
+    except (TypeError, ValueError):
+        return None
+
+
+def documento_publicacion(clave, elementos):
+    """JSON listo para servir de una publicación completa.
+
+    Los elementos van como filas [tipo, contenido, estilo_id]: el texto
+    de cada estilo se guarda una sola vez en blog_estilos.
+    """
+    ano, mes, dia, numero_publicacion = clave
+    return json.dumps({
+        'dia': dia,
+        'mes': mes,
+        'ano': ano,
+        'numero_publicacion': numero_publicacion,
+        'elementos': [
+            [elemento['tipo_contenido'], elemento['contenido'], elemento['estilo_id']] for elemento in elementos
+        ]
+    }, ensure_ascii=False, default=str)
+
+
+def normalizar_clave(clave):
+    """Clave de publicación comparada como lo hace la colación de MySQL"""
+    ano, mes, dia, numero_publicacion = clave
+    # Internado: las claves de una carga grande comparten las doce cadenas de mes
+    return (ano, sys.intern((mes or '').rstrip().casefold()), dia, numero_publicacion)
+
+
+def condicion_claves(cantidad):
+    """WHERE para `cantidad` publicaciones: un rango del índice por cada una"""
+    return ' OR '.join(['(ano = %s AND mes = %s AND dia = %s AND numero_publicacion = %s)'] * cantidad)
+
+
+def _agrupar_elementos(cursor, claves):
+    """Elementos de cada publicación en el orden original del archivo (por id).
+
+    Una publicación puede mezclar elementos de varias cargas: los que una
+    carga posterior no cambió conservan su registro_id original.
+    """
+    cursor.execute(f'''
+        SELECT {', '.join(COLUMNAS_CLAVE)}, tipo_contenido, contenido, estilo_id
+        FROM blog_contenido
+        WHERE {condicion_claves(len(claves))}
+        ORDER BY id
+    ''', [v for clave in claves for v in clave])
+    grupos = {clave: [] for clave in claves}
+    # La colación de MySQL ignora mayúsculas: agrupar con la misma regla
+    canonicas = {normalizar_clave(clave): clave for clave in claves}
+    for ano, mes, dia, numero, tipo_contenido, contenido, estilo_id in cursor.fetchall():
+        clave = canonicas[normalizar_clave((ano, mes, dia, numero))]
+        grupos[clave].append({
+            'tipo_contenido': tipo_contenido,
+            'contenido': contenido,
+            'estilo_id': estilo_id
+        })
+    return grupos
+
+
+def materializar_claves(cursor, registro_id, claves, dialecto='mysql'):
+    """Guardar en blog_publicaciones las publicaciones indicadas.
+
+    Una publicación se identifica por (año, mes, día, número); si ya
+    existía, se reemplaza, queda asociada a `registro_id` y pasa a ser la
+    más reciente. Las que se quedaron sin elementos se eliminan.
+    Devuelve el número de publicaciones materializadas.
+    """
+    # Una sola entrada por publicación aunque el mes llegue con otra capitalización
+    claves = list({normalizar_clave(clave): clave for clave in claves}.values())
+    for inicio in range(0, len(claves), PUBLICACIONES_POR_LOTE):
+        lote = claves[inicio:inicio + PUBLICACIONES_POR_LOTE]
+        grupos = _agrupar_elementos(cursor, lote)
+        filas = [
+            clave + (registro_id, len(elementos), documento_publicacion(clave, elementos), lista_estilos(elementos),
+                     fecha_publicacion(clave[0], clave[1], clave[2]), texto_publicacion(elementos))
+            for clave, elementos in grupos.items() if elementos
+        ]
+        vacias = [clave for clave, elementos in grupos.items() if not elementos]
+        if filas:
+            cursor.executemany(SQL_MATERIALIZAR[dialecto], filas)
+        if vacias:
+            cursor.execute(
+                f"DELETE FROM blog_publicaciones WHERE {condicion_claves(len(vacias))}",
+                [v for clave in vacias for v in clave]
+            )
+    return len(claves)
+
+
+def materializar_publicaciones(conn, registro_id, claves, dialecto='mysql'):
+    """Materializar y confirmar las publicaciones que modificó una carga"""
+    cursor = conn.cursor()
+    try:
+        total = materializar_claves(cursor, registro_id, claves, dialecto)
+        conn.commit()
+        return total
+    finally:
+        cursor.close()
+
+
+def materializar_todo(cursor):
+    """Paso de migración: rehacer blog_publicaciones a partir de blog_contenido.
+
+    Cada publicación queda asociada a la carga más reciente que la tocó y
+    se escriben de la menos a la más recientemente cargada.
+    """
+    cursor.execute(f'''
+        SELECT {', '.join(COLUMNAS_CLAVE)}, MAX(registro_id)
+        FROM blog_contenido
+        GROUP BY {', '.join(COLUMNAS_CLAVE)}
+        ORDER BY MAX(id)
+    ''')
+    por_registro = {}
+    for ano, mes, dia, numero_publicacion, registro_id in cursor.fetchall():
+        por_registro.setdefault(registro_id, []).append((ano, mes, dia, numero_publicacion))
+    for registro_id, claves in por_registro.items():
+        materializar_claves(cursor, registro_id, claves)
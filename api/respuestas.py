@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+
+import azure.functions as func
+
+from metricas import fase
+
+# Dependencias opcionales: si no están instaladas se usa la biblioteca estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Por debajo de este tamaño comprimir cuesta más de lo que ahorra
+TAMANO_MINIMO_COMPRESION = int(os.environ.get('COMPRESION_MIN_BYTES', '1024'))
+NIVEL_GZIP = 5
+CALIDAD_BROTLI = 4
+
+CABECERAS_CORS = {"Access-Control-Allow-Origin": "*"}
+
+
+def serializar(datos):
+    """JSON en bytes; orjson maneja datetime de forma nativa"""
+    with fase('serializacion'):
+        if orjson is not None:
+            return orjson.dumps(datos, default=str)
+        return json.dumps(datos, default=str, ensure_ascii=False).encode('utf-8')
+
+
+def elegir_codificacion(accept_encoding):
+    """Elegir br o gzip según Accept-Encoding (respetando q=0)"""
+    if not accept_encoding:
+        return None
+    aceptadas = {}
+    for parte in accept_encoding.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre.strip().lower()] = calidad
+    for codificacion in ('br', 'gzip'):
+        if codificacion == 'br' and brotli is None:
+            continue
+        if aceptadas.get(codificacion, aceptadas.get('*', 0)) > 0:
+            return codificacion
+    return None
+
+
+def comprimir(cuerpo, codificacion):
+    if codificacion == 'br':
+        return brotli.compress(cuerpo, quality=CALIDAD_BROTLI)
+    if codificacion == 'gzip':
+        return gzip.compress(cuerpo, compresslevel=NIVEL_GZIP)
+    return cuerpo
+
+
+def codificacion_respuesta(req, cuerpo):
+    """Codificación con la que se enviará `cuerpo` a esta petición (None sin comprimir)"""
+    if len(cuerpo) < TAMANO_MINIMO_COMPRESION:
+        return None
+    return elegir_codificacion(req.headers.get('Accept-Encoding') if req else None)
+
+
+def respuesta_bytes(req, cuerpo, status_code=200, headers=None, comprimido=None):
+    """Respuesta JSON a partir de bytes ya serializados.
+
+    `comprimido` permite reutilizar variantes ya comprimidas (caché):
+    recibe la codificación y devuelve los bytes codificados.
+    """
+    cabeceras = dict(CABECERAS_CORS)
+    cabeceras.update(headers or {})
+    if len(cuerpo) >= TAMANO_MINIMO_COMPRESION:
+        codificacion = codificacion_respuesta(req, cuerpo)
+        cabeceras["Vary"] = "Accept-Encoding"
+        if codificacion:
+            with fase('compresion'):
+                cuerpo = comprimido(codificacion) if comprimido else comprimir(cuerpo, codificacion)
+            cabeceras["Content-Encoding"] = codificacion
+    return func.HttpResponse(
+        cuerpo,
+        status_code=status_code,
+        mimetype="application/json",
+        charset="utf-8",
+        headers=cabeceras
+    )
+
+
+def respuesta_json(req, datos, status_code=200, headers=None):
+    """Respuesta JSON con CORS y compresión negociada"""
+    return respuesta_bytes(req, serializar(datos), status_code, headers)
+
+
+def respuesta_vacia(status_code, headers=None):
+    cabeceras = dict(CABECERAS_CORS)
+    cabeceras.update(headers or {})
+    return func.HttpResponse(status_code=status_code, headers=cabeceras)
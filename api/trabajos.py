@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Cola de los trabajos de ingesta: 'azure' (Storage Queue) o 'local' (hilo en proceso).
+# Por defecto, la Storage Queue siempre que la app tenga cuenta de almacenamiento:
+# un hilo local muere con la instancia y su trabajo no se reintenta
+BACKEND_COLA = os.environ.get('BLOG_COLA') or ('azure' if os.environ.get('AzureWebJobsStorage') else 'local')
+NOMBRE_COLA = os.environ.get('BLOG_COLA_NOMBRE', 'ingestas')
+# Archivos a partir de este tamaño se procesan en segundo plano (?modo=async|sync fuerza uno)
+SUBIDA_ASINCRONA_BYTES = int(os.environ.get('SUBIDA_ASINCRONA_BYTES', str(8 * 1024 * 1024)))
+# El archivo se guarda en partes por debajo de max_allowed_packet de MySQL
+TAMANO_PARTE = 4 * 1024 * 1024
+# Un trabajo 'procesando' sin avanzar este tiempo se da por perdido (instancia
+# reciclada) y otra entrega del mensaje puede reclamarlo
+TRABAJO_SIN_LATIDO_SEGUNDOS = float(os.environ.get('TRABAJO_SIN_LATIDO_SEGUNDOS', '300'))
+
+_COLUMNAS_TRABAJO = (
+    'id', 'registro_id', 'nombre_archivo', 'usuario', 'huella', 'parametros', 'estado',
+    'bytes_archivo', 'filas_procesadas', 'filas_por_segundo', 'error', 'resultado',
+    'fecha_creacion', 'fecha_inicio', 'fecha_fin', 'latido'
+)
+# Lo que devuelve el estado de un trabajo (sin huella, parámetros ni latido internos)
+_COLUMNAS_ESTADO = tuple(c for c in _COLUMNAS_TRABAJO if c not in ('huella', 'parametros', 'latido'))
+
+
+def tamano_flujo(flujo):
+    """Bytes de un flujo con seek, dejándolo al principio"""
+    flujo.seek(0, os.SEEK_END)
+    tamano = flujo.tell()
+    flujo.seek(0)
+    return tamano
+
+
+def crear_trabajo(conn, nombre_archivo, usuario, huella, flujo, parametros):
+    """Guardar el archivo y crear su registro de actualización y su trabajo.
+
+    El registro queda con cantidad_registros = 0 hasta que el trabajo
+    termine. Devuelve (trabajo_id, registro_id).
+    """
+    trabajo_id = uuid.uuid4().hex
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO registros_actualizacion
+            (nombre_archivo, usuario, cantidad_registros, fecha_actualizacion, huella)
+            VALUES (%s, %s, 0, NOW(), %s)
+        ''', (nombre_archivo, usuario, huella))
+        registro_id = cursor.lastrowid
+        cursor.execute('''
+            INSERT INTO trabajos_ingesta
+            (id, registro_id, nombre_archivo, usuario, huella, parametros, estado, bytes_archivo, fecha_creacion)
+            VALUES (%s, %s, %s, %s, %s, %s, 'pendiente', %s, NOW())
+        ''', (trabajo_id, registro_id, nombre_archivo, usuario, huella,
+              json.dumps(parametros), tamano_flujo(flujo)))
+        parte = 0
+        while True:
+            datos = flujo.read(TAMANO_PARTE)
+            if not datos:
+                break
+            cursor.execute(
+                "INSERT INTO trabajos_ingesta_partes (trabajo_id, parte, datos) VALUES (%s, %s, %s)",
+                (trabajo_id, parte, datos)
+            )
+            parte += 1
+        conn.commit()
+        return trabajo_id, registro_id
+    finally:
+        cursor.close()
+
+
+def _fila_trabajo(cursor, trabajo_id):
+    cursor.execute(f"SELECT {', '.join(_COLUMNAS_TRABAJO)} FROM trabajos_ingesta WHERE id = %s", (trabajo_id,))
+    fila = cursor.fetchone()
+    return dict(zip(_COLUMNAS_TRABAJO, fila)) if fila else None
+
+
+class TrabajoEnCurso(Exception):
+    """Otra instancia procesa el trabajo y sigue dando señales de vida"""
+
+
+def reclamar_trabajo(conn, trabajo_id):
+    """Pasar un trabajo a 'procesando'; None si ya terminó o no existe.
+
+    Se reclaman los pendientes y los que siguen 'procesando' sin latido
+    reciente: la instancia que los tomó se recicló sin cerrarlos, y sus
+    lotes ya confirmados se comparan de nuevo como elementos sin cambios
+    (`reintento` indica a la carga que debe recontar el total de elementos).
+    Si el trabajo sigue vivo en otra instancia lanza TrabajoEnCurso para
+    que la cola vuelva a entregar el mensaje más tarde.
+    """
+    ahora = time.time()
+    cursor = conn.cursor()
+    try:
+        # Un trabajo con fecha_inicio ya lo tomó otra entrega: reintento de un intento interrumpido
+        cursor.execute("SELECT fecha_inicio FROM trabajos_ingesta WHERE id = %s", (trabajo_id,))
+        fila = cursor.fetchone()
+        reintento = fila is not None and fila[0] is not None
+        # El latido es time.time() de la instancia: no depende de la zona horaria de la BD
+        cursor.execute('''
+            UPDATE trabajos_ingesta
+            SET estado = 'procesando', fecha_inicio = NOW(), filas_procesadas = 0, latido = %s
+            WHERE id = %s AND (estado = 'pendiente'
+                               OR (estado = 'procesando' AND (latido IS NULL OR latido < %s)))
+        ''', (ahora, trabajo_id, ahora - TRABAJO_SIN_LATIDO_SEGUNDOS))
+        conn.commit()
+        reclamado = cursor.rowcount == 1
+        trabajo = _fila_trabajo(cursor, trabajo_id)
+        if not reclamado:
+            if trabajo and trabajo['estado'] == 'procesando':
+                raise TrabajoEnCurso(f"El trabajo {trabajo_id} sigue en curso en otra instancia")
+            return None
+        trabajo['parametros'] = json.loads(trabajo['parametros'] or '{}')
+        trabajo['reintento'] = reintento
+        return trabajo
+    finally:
+        cursor.close()
+
+
+def archivo_trabajo(conn, trabajo_id):
+    """Archivo temporal con el contenido subido, leído parte a parte"""
+    archivo = tempfile.TemporaryFile()
+    cursor = conn.cursor()
+    try:
+        parte = 0
+        while True:
+            cursor.execute(
+                "SELECT datos FROM trabajos_ingesta_partes WHERE trabajo_id = %s AND parte = %s",
+                (trabajo_id, parte)
+            )
+            fila = cursor.fetchone()
+            if fila is None:
+                break
+            archivo.write(fila[0])
+            parte += 1
+    except Exception:
+        archivo.close()
+        raise
+    finally:
+        cursor.close()
+    archivo.seek(0)
+    return archivo
+
+
+class Progreso:
+    """Avance de un trabajo en esta instancia; se guarda en la BD, con su latido, tras cada lote"""
+
+    def __init__(self, trabajo):
+        self.trabajo = {columna: trabajo[columna] for columna in _COLUMNAS_ESTADO}
+        self.inicio = time.monotonic()
+
+    def anotar(self, conn, filas):
+        with _en_curso_lock:
+            self.trabajo['filas_procesadas'] = filas
+            segundos = time.monotonic() - self.inicio
+            self.trabajo['filas_por_segundo'] = round(filas / segundos, 1) if segundos > 0 else None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE trabajos_ingesta SET filas_procesadas = %s, filas_por_segundo = %s, latido = %s "
+                "WHERE id = %s",
+                (filas, self.trabajo['filas_por_segundo'], time.time(), self.trabajo['id'])
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def estado(self):
+        with _en_curso_lock:
+            return dict(self.trabajo)
+
+
+# Trabajos en curso en esta instancia: su estado se sirve sin esperar a la BD
+# (con SQLite la única conexión está ocupada por la propia ingesta)
+_en_curso = {}
+_en_curso_lock = threading.Lock()
+
+
+@contextmanager
+def en_curso(trabajo):
+    progreso = Progreso(trabajo)
+    with _en_curso_lock:
+        _en_curso[trabajo['id']] = progreso
+    try:
+        yield progreso
+    finally:
+        with _en_curso_lock:
+            _en_curso.pop(trabajo['id'], None)
+
+
+def progreso_local(trabajo_id):
+    with _en_curso_lock:
+        progreso = _en_curso.get(trabajo_id)
+    return progreso.estado() if progreso else None
+
+
+def finalizar_trabajo(conn, trabajo_id, resultado=None, error=None, progreso=None):
+    """Cerrar el trabajo como completado o con error y borrar el archivo guardado.
+
+    Si falló antes de cerrar la carga, su registro (aún con 0 elementos)
+    se elimina igual que en una subida síncrona fallida.
+    """
+    trabajo = progreso.estado() if progreso else {'filas_procesadas': 0, 'filas_por_segundo': None}
+    cursor = conn.cursor()
+    try:
+        conn.rollback()
+        cursor.execute('''
+            UPDATE trabajos_ingesta
+            SET estado = %s, filas_procesadas = %s, filas_por_segundo = %s, resultado = %s, error = %s,
+                fecha_fin = NOW()
+            WHERE id = %s
+        ''', ('error' if error else 'completado', trabajo['filas_procesadas'], trabajo['filas_por_segundo'],
+              json.dumps(resultado, ensure_ascii=False, default=str) if resultado else None,
+              error, trabajo_id))
+        if error:
+            cursor.execute('''
+                DELETE FROM registros_actualizacion
+                WHERE id = (SELECT registro_id FROM trabajos_ingesta WHERE id = %s) AND cantidad_registros = 0
+            ''', (trabajo_id,))
+        cursor.execute("DELETE FROM trabajos_ingesta_partes WHERE trabajo_id = %s", (trabajo_id,))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def leer_trabajo(conn, trabajo_id):
+    """Estado de un trabajo listo para serializar; None si no existe"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(_COLUMNAS_ESTADO)} FROM trabajos_ingesta WHERE id = %s", (trabajo_id,))
+        fila = cursor.fetchone()
+    finally:
+        cursor.close()
+    if fila is None:
+        return None
+    trabajo = dict(zip(_COLUMNAS_ESTADO, fila))
+    trabajo['resultado'] = json.loads(trabajo['resultado']) if trabajo['resultado'] else None
+    return trabajo
+
+
+class ColaLocal:
+    """Un hilo en proceso: para desarrollo y pruebas sin Azure Storage"""
+
+    def __init__(self, procesar):
+        self._procesar = procesar
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingesta')
+
+    def encolar(self, trabajo_id):
+        futuro = self._ejecutor.submit(self._procesar, trabajo_id)
+        futuro.add_done_callback(_registrar_fallo)
+        return futuro
+
+
+def _registrar_fallo(futuro):
+    if futuro.exception() is not None:
+        logging.error(f"❌ Error en el trabajo de ingesta: {str(futuro.exception())}")
+
+
+class ColaAzure:
+    """Storage Queue que consume el queue trigger de function_app"""
+
+    def __init__(self, procesar):
+        try:
+            from azure.storage.queue import QueueClient, TextBase64EncodePolicy
+        except ImportError as e:
+            raise RuntimeError("BLOG_COLA=azure requiere el paquete azure-storage-queue") from e
+        # Base64: la codificación que espera por defecto el queue trigger
+        self._cliente = QueueClient.from_connection_string(
+            os.environ['AzureWebJobsStorage'], NOMBRE_COLA,
+            message_encode_policy=TextBase64EncodePolicy()
+        )
+
+    def encolar(self, trabajo_id):
+        self._cliente.send_message(trabajo_id)
+
+
+_COLAS = {
+    'local': ColaLocal,
+    'azure': ColaAzure,
+}
+
+_cola = None
+_cola_lock = threading.Lock()
+
+
+def get_cola(procesar):
+    """Cola configurada en BLOG_COLA; `procesar(trabajo_id)` la consume en modo local"""
+    global _cola
+    if _cola is None:
+        with _cola_lock:
+            if _cola is None:
+                if BACKEND_COLA not in _COLAS:
+                    raise ValueError(f"BLOG_COLA desconocida: {BACKEND_COLA}")
+                _cola = _COLAS[BACKEND_COLA](procesar)
+                logging.info(f"✅ Cola de ingesta: {BACKEND_COLA}")
+    return _cola
@@ -0,0 +1,265 @@
+import os
+import re
+
+from publicaciones import fecha_publicacion, numero_mes
+
+COLUMNAS_REQUERIDAS = ('Día', 'Mes', 'Año', 'N° Publicación', 'Tipo', 'Contenido / URL')
+COLUMNA_ESTILO = 'Estilo'
+TIPOS_CONTENIDO = ('T', 'ST', 'P', 'I')
+
+# Filas que se validan juntas: cada columna del bloque se comprueba de una vez.
+# Bloques pequeños caben en la caché del procesador al recorrerlos por columnas
+FILAS_POR_BLOQUE = int(os.environ.get('VALIDACION_FILAS_POR_BLOQUE', '250'))
+# Errores detallados en el informe; a partir de aquí sólo se cuentan
+MAX_ERRORES_INFORME = int(os.environ.get('VALIDACION_MAX_ERRORES', '100'))
+# Valores distintos recordados por columna entre bloques (acota la memoria)
+MAX_VALORES_CACHE = 100000
+
+ANO_MINIMO = 1900
+ANO_MAXIMO = 2100
+
+# Las imágenes se sirven como <img src>: URL absoluta http(s) sin espacios
+_URL = re.compile(r'https?://[^\s/?#]+\S*\Z', re.IGNORECASE)
+
+
+class ErrorArchivo(Exception):
+    """El archivo subido no tiene el formato esperado"""
+
+
+class ErrorValidacion(ErrorArchivo):
+    """Columnas o filas inválidas; `informe` detalla cada error"""
+
+    def __init__(self, informe):
+        super().__init__(informe.mensaje())
+        self.informe = informe
+
+
+class InformeValidacion:
+    """Errores por fila de un archivo, listos para devolver en la respuesta"""
+
+    def __init__(self):
+        self.filas = 0
+        self.filas_con_errores = 0
+        self.columnas_faltantes = []
+        self.errores_por_columna = {}
+        self.errores = []
+
+    @property
+    def valido(self):
+        return not self.columnas_faltantes and not self.filas_con_errores
+
+    def anotar(self, filas, errores):
+        """Sumar un bloque de `filas` con sus errores (fila, columna, valor, mensaje)"""
+        self.filas += filas
+        self.filas_con_errores += len({fila for fila, _, _, _ in errores})
+        for error in sorted(errores):
+            self.errores_por_columna[error[1]] = self.errores_por_columna.get(error[1], 0) + 1
+            if len(self.errores) < MAX_ERRORES_INFORME:
+                self.errores.append(error)
+
+    def mensaje(self):
+        partes = []
+        if self.columnas_faltantes:
+            partes.append(f"Faltan columnas requeridas: {', '.join(self.columnas_faltantes)}")
+        if self.filas_con_errores:
+            fila, columna, _, mensaje = self.errores[0]
+            partes.append(f"{self.filas_con_errores} filas con errores (fila {fila}, {columna}: {mensaje})")
+        return '. '.join(partes)
+
+    def resumen(self):
+        return {
+            "valido": self.valido,
+            "filas": self.filas,
+            "filas_con_errores": self.filas_con_errores,
+            "columnas_faltantes": self.columnas_faltantes,
+            "errores_por_columna": self.errores_por_columna,
+            "errores": [
+                {"fila": fila, "columna": columna, "valor": valor[:100], "error": mensaje}
+                for fila, columna, valor, mensaje in self.errores
+            ],
+            "errores_omitidos": sum(self.errores_por_columna.values()) - len(self.errores),
+        }
+
+
+def _entero(minimo, maximo):
+    def convertir(valor):
+        texto = valor.strip()
+        if not texto:
+            raise ValueError("vacío")
+        try:
+            numero = int(texto)
+        except ValueError:
+            raise ValueError("no es un número entero") from None
+        if not minimo <= numero <= maximo:
+            raise ValueError(f"fuera de rango ({minimo}-{maximo})")
+        return numero
+    return convertir
+
+
+def _mes(valor):
+    # Se guarda tal cual: la clave de la publicación se normaliza al compararla
+    if numero_mes(valor) is None:
+        raise ValueError("mes no reconocido")
+    return valor
+
+
+def _tipo(valor):
+    tipo = valor.strip().upper()
+    if tipo not in TIPOS_CONTENIDO:
+        raise ValueError(f"tipo no permitido ({', '.join(TIPOS_CONTENIDO)})")
+    return tipo
+
+
+class _Columna:
+    """Conversión de una columna con caché por valor distinto.
+
+    Día, mes, año, número y tipo repiten pocos valores: cada valor
+    distinto se convierte una vez y el bloque se resuelve con búsquedas
+    en diccionario.
+    """
+
+    def __init__(self, nombre, convertir):
+        self.nombre = nombre
+        self.convertir = convertir
+        self.validos = {}
+        self.invalidos = {}
+
+    def aplicar(self, valores, numeros, errores):
+        """Valores convertidos del bloque (None en los inválidos)"""
+        if len(self.validos) + len(self.invalidos) > MAX_VALORES_CACHE:
+            self.validos.clear()
+            self.invalidos.clear()
+        distintos = set(valores)
+        for valor in distintos.difference(self.validos, self.invalidos):
+            try:
+                self.validos[valor] = self.convertir(valor)
+            except ValueError as e:
+                self.invalidos[valor] = str(e)
+        if not distintos.isdisjoint(self.invalidos):
+            errores.extend(
+                (numero, self.nombre, valor, self.invalidos[valor])
+                for numero, valor in zip(numeros, valores) if valor in self.invalidos
+            )
+        return list(map(self.validos.get, valores))
+
+
+class _Validador:
+    """Validación por columnas de los bloques de un archivo"""
+
+    def __init__(self, posiciones):
+        self.posiciones = posiciones
+        self.columnas = {
+            'dia': _Columna('Día', _entero(1, 31)),
+            'mes': _Columna('Mes', _mes),
+            'ano': _Columna('Año', _entero(ANO_MINIMO, ANO_MAXIMO)),
+            'numero_publicacion': _Columna('N° Publicación', _entero(1, 2 ** 31 - 1)),
+            'tipo_contenido': _Columna('Tipo', _tipo),
+        }
+        self.fechas = {}
+
+    def aplicar(self, numeros, filas):
+        """(columnas convertidas, errores) de un bloque de filas de igual o mayor ancho que la cabecera"""
+        errores = []
+        convertidas = {}
+        # Trasponer una sola vez: cada comprobación recorre una columna entera
+        columnas = list(zip(*filas))
+        for campo, columna in self.columnas.items():
+            posicion = self.posiciones.get(columna.nombre)
+            convertidas[campo] = (columna.aplicar(columnas[posicion], numeros, errores) if posicion is not None
+                                  else [None] * len(filas))
+        for campo, nombre in (('contenido', 'Contenido / URL'), ('estilo', COLUMNA_ESTILO)):
+            posicion = self.posiciones.get(nombre)
+            convertidas[campo] = (list(map(str.strip, columnas[posicion])) if posicion is not None
+                                  else [''] * len(filas))
+
+        # Día, mes y año por separado pueden no formar una fecha (31 de febrero)
+        claves = list(zip(convertidas['ano'], convertidas['mes'], convertidas['dia']))
+        if len(self.fechas) > MAX_VALORES_CACHE:
+            self.fechas.clear()
+        for clave in set(claves).difference(self.fechas):
+            self.fechas[clave] = fecha_publicacion(*clave) if None not in clave else None
+        convertidas['fecha_publicacion'] = fechas = list(map(self.fechas.get, claves))
+        if None in fechas:
+            errores.extend(
+                (numero, 'Fecha', f"{dia} {mes} {ano}", "la fecha no existe")
+                for numero, fecha, (ano, mes, dia) in zip(numeros, fechas, claves)
+                if fecha is None and None not in (ano, mes, dia)
+            )
+
+        if 'I' in convertidas['tipo_contenido'] and 'Contenido / URL' in self.posiciones:
+            errores.extend(
+                (numero, 'Contenido / URL', contenido, "la imagen necesita una URL http(s)")
+                for numero, tipo, contenido in zip(numeros, convertidas['tipo_contenido'], convertidas['contenido'])
+                if tipo == 'I' and not _URL.match(contenido)
+            )
+        return convertidas, errores
+
+
+def validar_bloques(bloques, informe):
+    """Generador de bloques validados: (números de fila, columnas convertidas).
+
+    `bloques` produce listas con todas las filas del archivo en orden,
+    vacías incluidas, para que el número de fila del informe sea el que
+    ve el usuario en su hoja de cálculo. La primera fila no vacía es la
+    cabecera. Las columnas faltantes y los errores de cada bloque se
+    anotan en `informe`; los valores inválidos quedan como None.
+    """
+    validador = None
+    numero = 0
+    for filas in bloques:
+        inicio = numero + 1
+        numero += len(filas)
+        if validador is None:
+            cabecera = next((i for i, valores in enumerate(filas) if any(valores)), None)
+            if cabecera is None:
+                continue
+            columnas = [columna.strip() for columna in filas[cabecera]]
+            posiciones = {nombre: columnas.index(nombre) for nombre in COLUMNAS_REQUERIDAS + (COLUMNA_ESTILO,)
+                          if nombre in columnas}
+            informe.columnas_faltantes = [nombre for nombre in COLUMNAS_REQUERIDAS if nombre not in posiciones]
+            validador = _Validador(posiciones)
+            ancho = len(columnas)
+            inicio += cabecera + 1
+            filas = filas[cabecera + 1:]
+            if not filas:
+                continue
+        if min(map(len, filas)) < ancho:
+            # Filas cortas (o vacías): las celdas que faltan cuentan como vacías
+            filas = [v if len(v) >= ancho else list(v) + [''] * (ancho - len(v)) for v in filas]
+        numeros = range(inicio, inicio + len(filas))
+        convertidas, errores = validador.aplicar(numeros, filas)
+        if errores:
+            # Las filas vacías no son errores: se quitan del bloque y se valida otra vez
+            vacias = {fila for fila, _, _, _ in errores if not any(filas[fila - inicio])}
+            if vacias:
+                numeros = [fila for fila in numeros if fila not in vacias]
+                filas = [filas[fila - inicio] for fila in numeros]
+                if not filas:
+                    continue
+                convertidas, errores = validador.aplicar(numeros, filas)
+        informe.anotar(len(numeros), errores)
+        yield numeros, convertidas
+
+
+# Orden de los campos de un elemento de blog_contenido
+CAMPOS_ELEMENTO = (
+    'dia', 'mes', 'ano', 'numero_publicacion', 'tipo_contenido', 'contenido', 'estilo', 'fecha_publicacion'
+)
+
+
+def elementos_bloque(convertidas):
+    """Elementos de blog_contenido de un bloque ya validado"""
+    return [
+        {
+            'dia': dia,
+            'mes': mes,
+            'ano': ano,
+            'numero_publicacion': numero_publicacion,
+            'tipo_contenido': tipo_contenido,
+            'contenido': contenido,
+            'estilo': estilo,
+            'fecha_publicacion': fecha,
+        }
+        for dia, mes, ano, numero_publicacion, tipo_contenido, contenido, estilo, fecha
+        in zip(*(convertidas[campo] for campo in CAMPOS_ELEMENTO))
+    ]
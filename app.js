@@ -1,24 +1,50 @@
 // API Base URL
 const API_BASE = '/api';
 
+// Estado de la paginación del blog (cursor devuelto por la API)
+let publicacionesBlog = [];
+let cursorBlog = null;
+
 // Función para cargar contenido del blog - REQUERIMIENTO PRINCIPAL
-async function cargarBlog() {
+async function cargarBlog(cargarMas = false) {
     try {
-        mostrarCargandoBlog();
+        if (!cargarMas) {
+            mostrarCargandoBlog();
+            publicacionesBlog = [];
+            cursorBlog = null;
+        }
         
-        const response = await fetch(`${API_BASE}/blog`);
-        const contenido = await response.json();
+        // Formato compacto: cada estilo viaja una vez por página en vez de en cada elemento
+        const url = cargarMas && cursorBlog
+            ? `${API_BASE}/blog?formato=compacto&after=${encodeURIComponent(cursorBlog)}`
+            : `${API_BASE}/blog?formato=compacto`;
+        const response = await fetch(url);
+        const data = await response.json();
         
         if (response.ok) {
-            mostrarContenidoBlog(contenido);
+            publicacionesBlog = publicacionesBlog.concat(expandirPublicaciones(data));
+            cursorBlog = data.next_cursor;
+            mostrarContenidoBlog(publicacionesBlog);
         } else {
-            mostrarErrorBlog('Error al cargar el contenido del blog: ' + (contenido.error || 'Error desconocido'));
+            mostrarErrorBlog('Error al cargar el contenido del blog: ' + (data.error || 'Error desconocido'));
         }
     } catch (error) {
         mostrarErrorBlog('Error de conexión: ' + error.message);
     }
 }
 
+// Elementos [tipo, contenido, estilo_id] de ?formato=compacto como objetos
+function expandirPublicaciones(data) {
+    return data.publicaciones.map(publicacion => ({
+        ...publicacion,
+        elementos: publicacion.elementos.map(([tipo_contenido, contenido, estiloId]) => ({
+            tipo_contenido,
+            contenido,
+            estilo: estiloId === null ? '' : data.estilos[estiloId]
+        }))
+    }));
+}
+
 function mostrarCargandoBlog() {
     const contenedor = document.getElementById('contenido-blog');
     contenedor.innerHTML = `
@@ -31,10 +57,11 @@ function mostrarCargandoBlog() {
 }
 
 // Función para mostrar contenido del blog según requerimientos de la práctica
-function mostrarContenidoBlog(contenido) {
+// Recibe publicaciones ya agrupadas por la API, con sus elementos en orden
+function mostrarContenidoBlog(publicaciones) {
     const contenedor = document.getElementById('contenido-blog');
     
-    if (!contenido || contenido.length === 0) {
+    if (!publicaciones || publicaciones.length === 0) {
         contenedor.innerHTML = `
             <div class="blog-vacio">
                 <h1 style="color: #2c3e50; text-align: center; margin-bottom: 1rem;">🚀 Blog de Rápido Express</h1>
@@ -94,79 +121,90 @@ Día,Mes,Año,N° Publicación,Tipo,Contenido / URL,Estilo
     }
     
     let html = '';
-    let publicacionActual = null;
-    let contadorPublicaciones = 0;
+    let totalElementos = 0;
     
-    contenido.forEach((item, index) => {
-        const estilo = item.estilo || '';
-        
-        // Agrupar por publicación
-        if (item.numero_publicacion !== publicacionActual) {
-            if (publicacionActual !== null) {
-                html += `<hr style="margin: 3rem 0; border: none; border-top: 2px dashed #ecf0f1;">`;
-            }
-            publicacionActual = item.numero_publicacion;
-            contadorPublicaciones++;
-            
-            // Mostrar información de la publicación
-            if (item.dia && item.mes && item.ano) {
-                html += `
-                    <div style="text-align: center; margin-bottom: 2rem; padding: 1rem; background: #f8f9fa; border-radius: 8px;">
-                        <small style="color: #7f8c8d; font-size: 14px;">
-                            📅 Publicación #${item.numero_publicacion} - ${item.dia} de ${item.mes} de ${item.ano}
-                        </small>
-                    </div>
-                `;
-            }
+    publicaciones.forEach((publicacion, indice) => {
+        if (indice > 0) {
+            html += `<hr style="margin: 3rem 0; border: none; border-top: 2px dashed #ecf0f1;">`;
         }
         
-        // Generar contenido según tipo - REQUERIMIENTO PRINCIPAL
-        switch(item.tipo_contenido?.toUpperCase()) {
-            case 'T': // Título principal <h1>
-                html += `<h1 style="${estilo}">${item.contenido}</h1>`;
-                break;
-                
-            case 'ST': // Subtítulo <h3>
-                html += `<h3 style="${estilo}">${item.contenido}</h3>`;
-                break;
-                
-            case 'P': // Párrafo <p>
-                // Convertir saltos de línea en <br>
-                const contenidoConSaltos = item.contenido.replace(/\n/g, '<br>');
-                html += `<p style="${estilo}">${contenidoConSaltos}</p>`;
-                break;
-                
-            case 'I': // Imagen <img>
-                html += `
-                    <div style="text-align: center; margin: 2rem 0;">
-                        <img src="${item.contenido}" style="${estilo}; max-width: 100%; height: auto; border-radius: 8px; box-shadow: 0 4px 8px rgba(0,0,0,0.1)" 
-                             alt="Imagen del blog" 
-                             onerror="this.style.display='none'; this.nextElementSibling.style.display='block'"
-                             loading="lazy">
-                        <div style="display: none; padding: 1rem; background: #fff3cd; color: #856404; border-radius: 4px; margin-top: 1rem;">
-                            🖼️ No se pudo cargar la imagen: ${item.contenido}
-                        </div>
-                    </div>
-                `;
-                break;
-                
-            default:
-                html += `<div style="${estilo}">${item.contenido}</div>`;
+        // Mostrar información de la publicación
+        if (publicacion.dia && publicacion.mes && publicacion.ano) {
+            html += `
+                <div style="text-align: center; margin-bottom: 2rem; padding: 1rem; background: #f8f9fa; border-radius: 8px;">
+                    <small style="color: #7f8c8d; font-size: 14px;">
+                        📅 Publicación #${publicacion.numero_publicacion} - ${publicacion.dia} de ${publicacion.mes} de ${publicacion.ano}
+                    </small>
+                </div>
+            `;
         }
+        
+        totalElementos += publicacion.elementos.length;
+        html += publicacion.elementos.map(generarElementoBlog).join('');
     });
     
     // Agregar contador al final
     html += `
         <div style="margin-top: 3rem; padding: 1rem; background: #e8f5e8; border-radius: 8px; text-align: center;">
             <small style="color: #27ae60;">
-                ✅ Contenido generado dinámicamente: ${contenido.length} elementos en ${contadorPublicaciones} publicaciones
+                ✅ Contenido generado dinámicamente: ${totalElementos} elementos en ${publicaciones.length} publicaciones
             </small>
         </div>
     `;
     
+    if (cursorBlog) {
+        html += `
+            <div style="text-align: center; margin-top: 1.5rem;">
+                <button onclick="cargarBlog(true)" class="btn-recargar">⬇️ Cargar más contenido</button>
+            </div>
+        `;
+    }
+    
     contenedor.innerHTML = html;
 }
 
+// Generar el HTML de un elemento según su tipo
+function generarElementoBlog(item) {
+    const estilo = item.estilo || '';
+    let html = '';
+    
+    // Generar contenido según tipo - REQUERIMIENTO PRINCIPAL
+    switch(item.tipo_contenido?.toUpperCase()) {
+        case 'T': // Título principal <h1>
+            html += `<h1 style="${estilo}">${item.contenido}</h1>`;
+            break;
+            
+        case 'ST': // Subtítulo <h3>
+            html += `<h3 style="${estilo}">${item.contenido}</h3>`;
+            break;
+            
+        case 'P': // Párrafo <p>
+            // Convertir saltos de línea en <br>
+            const contenidoConSaltos = item.contenido.replace(/\n/g, '<br>');
+            html += `<p style="${estilo}">${contenidoConSaltos}</p>`;
+            break;
+            
+        case 'I': // Imagen <img>
+            html += `
+                <div style="text-align: center; margin: 2rem 0;">
+                    <img src="${item.contenido}" style="${estilo}; max-width: 100%; height: auto; border-radius: 8px; box-shadow: 0 4px 8px rgba(0,0,0,0.1)" 
+                         alt="Imagen del blog" 
+                         onerror="this.style.display='none'; this.nextElementSibling.style.display='block'"
+                         loading="lazy">
+                    <div style="display: none; padding: 1rem; background: #fff3cd; color: #856404; border-radius: 4px; margin-top: 1rem;">
+                        🖼️ No se pudo cargar la imagen: ${item.contenido}
+                    </div>
+                </div>
+            `;
+            break;
+            
+        default:
+            html += `<div style="${estilo}">${item.contenido}</div>`;
+    }
+    
+    return html;
+}
+
 function mostrarErrorBlog(mensaje) {
     const contenedor = document.getElementById('contenido-blog');
     contenedor.innerHTML = `
@@ -179,6 +217,61 @@ function mostrarErrorBlog(mensaje) {
     `;
 }
 
+// Los valores del informe vienen del archivo subido: mostrarlos como texto
+function escaparHtml(texto) {
+    const div = document.createElement('div');
+    div.textContent = texto;
+    return div.innerHTML;
+}
+
+// Tabla con los errores por fila que devuelve /subir al rechazar un archivo
+function detalleValidacion(validacion) {
+    if (!validacion || !validacion.errores.length) return '';
+    const filas = validacion.errores.map(error => `
+        <tr>
+            <td>${error.fila}</td>
+            <td>${escaparHtml(error.columna)}</td>
+            <td>${escaparHtml(error.valor)}</td>
+            <td>${escaparHtml(error.error)}</td>
+        </tr>
+    `).join('');
+    const omitidos = validacion.errores_omitidos
+        ? `<p><em>…y ${validacion.errores_omitidos} errores más.</em></p>`
+        : '';
+    return `
+        <p><strong>Filas con errores:</strong> ${validacion.filas_con_errores} de ${validacion.filas}</p>
+        <table class="tabla-historial">
+            <thead><tr><th>Fila</th><th>Columna</th><th>Valor</th><th>Error</th></tr></thead>
+            <tbody>${filas}</tbody>
+        </table>
+        ${omitidos}
+    `;
+}
+
+// Consultar el estado de una subida en segundo plano hasta que termine
+async function esperarTrabajo(trabajoId, estado, nombreArchivo) {
+    while (true) {
+        await new Promise(resolver => setTimeout(resolver, 1500));
+        const response = await fetch(`${API_BASE}/subir/${trabajoId}`);
+        const trabajo = await response.json();
+        if (!response.ok) {
+            throw new Error(trabajo.error || `HTTP ${response.status}`);
+        }
+        if (trabajo.estado === 'completado' || trabajo.estado === 'error') {
+            return trabajo;
+        }
+        const velocidad = trabajo.filas_por_segundo ? ` · ${Math.round(trabajo.filas_por_segundo)} filas/s` : '';
+        estado.innerHTML = `
+            <div class="estado-cargando">
+                <div style="display: flex; align-items: center; gap: 0.5rem;">
+                    <div class="spinner"></div>
+                    <span>Procesando ${nombreArchivo} en segundo plano: ${trabajo.filas_procesadas} filas${velocidad}</span>
+                </div>
+            </div>
+        `;
+    }
+}
+
 // Función para subir archivo
 async function subirArchivo(event) {
     event.preventDefault();
@@ -197,8 +290,8 @@ async function subirArchivo(event) {
     const archivo = archivoInput.files[0];
     const extension = archivo.name.split('.').pop().toLowerCase();
     
-    if (!['csv', 'xlsx', 'xls'].includes(extension)) {
-        mostrarMensaje('Solo se permiten archivos CSV o Excel', 'error');
+    if (!['csv', 'xlsx'].includes(extension)) {
+        mostrarMensaje('Solo se permiten archivos CSV o Excel (.xlsx)', 'error');
         return;
     }
     
@@ -219,15 +312,25 @@ async function subirArchivo(event) {
             body: formData
         });
         
-        const resultado = await response.json();
+        let resultado = await response.json();
+        let correcto = response.ok;
         
-        if (response.ok) {
+        // 202: el archivo se procesa en segundo plano; seguir su trabajo hasta que termine
+        if (response.status === 202) {
+            const trabajo = await esperarTrabajo(resultado.trabajo_id, estado, archivo.name);
+            correcto = trabajo.estado === 'completado';
+            resultado = correcto ? trabajo.resultado : { error: trabajo.error, ...trabajo.resultado };
+        }
+        
+        if (correcto) {
             estado.innerHTML = `
                 <div class="estado-exito">
                     <div style="font-size: 24px; margin-bottom: 0.5rem;">✅</div>
                     <h4>¡Archivo procesado exitosamente!</h4>
                     <p><strong>Registro:</strong> #${resultado.registro_id}</p>
                     <p><strong>Elementos cargados:</strong> ${resultado.elementos_procesados}</p>
+                    <p><strong>Nuevos:</strong> ${resultado.insertados} · <strong>Actualizados:</strong> ${resultado.actualizados} · <strong>Sin cambios:</strong> ${resultado.sin_cambios}</p>
+                    ${resultado.duplicado ? `<p><em>${resultado.mensaje}</em></p>` : ''}
                     <p><strong>Tipos de contenido:</strong></p>
                     <ul>
                         ${resultado.tipos_contenido.T ? `<li>Títulos (T): ${resultado.tipos_contenido.T}</li>` : ''}
@@ -251,7 +354,8 @@ async function subirArchivo(event) {
                 <div class="estado-error">
                     <div style="font-size: 24px; margin-bottom: 0.5rem;">❌</div>
                     <h4>Error al procesar el archivo</h4>
-                    <p>${resultado.error}</p>
+                    <p>${escaparHtml(resultado.error)}</p>
+                    ${detalleValidacion(resultado.validacion)}
                     <p style="margin-top: 1rem; font-size: 0.9em; color: #666;">
                         Verifica que el archivo tenga el formato correcto y todas las columnas requeridas.
                     </p>
@@ -359,8 +463,12 @@ function mostrarHistorial(historial) {
     contenedor.innerHTML = html;
 }
 
+// Estado de la paginación del detalle (cursor devuelto por la API)
+let contenidoDetalle = [];
+let cursorDetalle = null;
+
 // Función para cargar detalle
-async function cargarDetalle() {
+async function cargarDetalle(cargarMas = false) {
     const urlParams = new URLSearchParams(window.location.search);
     const registroId = urlParams.get('id');
     
@@ -374,11 +482,21 @@ async function cargarDetalle() {
     }
     
     try {
-        const response = await fetch(`${API_BASE}/detalle/${registroId}`);
+        if (!cargarMas) {
+            contenidoDetalle = [];
+            cursorDetalle = null;
+        }
+        
+        const url = cargarMas && cursorDetalle
+            ? `${API_BASE}/detalle/${registroId}?after=${encodeURIComponent(cursorDetalle)}`
+            : `${API_BASE}/detalle/${registroId}`;
+        const response = await fetch(url);
         const data = await response.json();
         
         if (response.ok) {
-            mostrarDetalle(data.registro, data.contenido);
+            contenidoDetalle = contenidoDetalle.concat(data.contenido);
+            cursorDetalle = data.next_cursor;
+            mostrarDetalle(data.registro, contenidoDetalle);
         } else {
             document.getElementById('contenido-detalle').innerHTML = `
                 <div class="error-mensaje">
@@ -484,6 +602,14 @@ function mostrarDetalle(registro, contenido) {
         });
     }
     
+    if (cursorDetalle) {
+        html += `
+            <div style="text-align: center; margin-top: 1.5rem;">
+                <button onclick="cargarDetalle(true)" class="btn-recargar">⬇️ Cargar más elementos</button>
+            </div>
+        `;
+    }
+    
     html += `
                 </div>
             </div>
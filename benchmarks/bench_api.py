@@ -0,0 +1,266 @@
+"""Benchmark local de la API sobre SQLite (sin Azure ni MySQL).
+
+Genera CSV sintéticos con el formato de data/*.csv, los sube con
+subir_archivo y mide get_blog, get_historial y health_check llamando a
+los handlers con func.HttpRequest, igual que el host de Functions.
+
+Uso (desde la raíz del repositorio, con api/requirements.txt instalado):
+
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --filas 1000,100000 --json actual.json
+    python benchmarks/bench_api.py --base base.json --tolerancia 0.2
+
+Con --base termina con código 1 si algún escenario empeora más que la
+tolerancia en p99 o en rendimiento respecto a la referencia.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# El almacenamiento se elige al importar function_app
+os.environ.setdefault('BLOG_ALMACENAMIENTO', 'sqlite')
+sys.path.insert(0, os.path.join(RAIZ, 'api'))
+
+import azure.functions as func  # noqa: E402
+
+COLUMNAS = ['Día', 'Mes', 'Año', 'N° Publicación', 'Tipo', 'Contenido / URL', 'Estilo']
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+         'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+# Estructura típica de una publicación en los CSV de ejemplo
+PLANTILLA = [
+    ('T', 'color:#2c3e50; font-size:36px; text-align:center;'),
+    ('P', 'color:#555; font-size:18px; line-height:1.6;'),
+    ('I', 'width:100%; border-radius:15px;'),
+    ('ST', 'color:#3498db; font-size:28px; margin-top:2rem;'),
+    ('P', 'color:#555; font-size:18px; line-height:1.6;'),
+]
+TEXTO = ('Blog de Rapido Express presenta nuevas soluciones de mensajería, '
+         'seguimiento de paquetes y entregas el mismo día en todo el país. ')
+
+FILAS_POR_DEFECTO = '1000,100000,1000000'
+
+
+def generar_csv(ruta, filas, semilla=0):
+    """Escribir un CSV de `filas` elementos agrupados en publicaciones"""
+    azar = random.Random(semilla)
+    with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(COLUMNAS)
+        escritas = 0
+        numero = 0
+        while escritas < filas:
+            numero += 1
+            dia, mes, ano = azar.randint(1, 28), azar.choice(MESES), azar.randint(2020, 2025)
+            for tipo, estilo in PLANTILLA:
+                if escritas >= filas:
+                    break
+                if tipo == 'I':
+                    contenido = f'https://images.unsplash.com/photo-{azar.randrange(10 ** 9)}?w=800'
+                else:
+                    contenido = TEXTO * azar.randint(1, 3)
+                escritor.writerow([dia, mes, ano, numero, tipo, contenido, estilo])
+                escritas += 1
+
+
+def peticion_subida(ruta, usuario='benchmark', params=None):
+    """POST multipart/form-data como el que envía subir.html"""
+    limite = 'limiteBenchmark' + os.urandom(8).hex()
+    with open(ruta, 'rb') as archivo:
+        contenido = archivo.read()
+    cuerpo = b''.join([
+        f'--{limite}\r\nContent-Disposition: form-data; name="usuario"\r\n\r\n{usuario}\r\n'.encode(),
+        f'--{limite}\r\nContent-Disposition: form-data; name="archivo"; '
+        f'filename="{os.path.basename(ruta)}"\r\nContent-Type: text/csv\r\n\r\n'.encode(),
+        contenido,
+        f'\r\n--{limite}--\r\n'.encode(),
+    ])
+    return func.HttpRequest(
+        'POST', 'http://localhost/api/subir',
+        headers={'Content-Type': f'multipart/form-data; boundary={limite}'},
+        params=params or {},
+        body=cuerpo
+    )
+
+
+def peticion_get(ruta, params=None):
+    return func.HttpRequest(
+        'GET', f'http://localhost/api/{ruta}',
+        headers={'Accept-Encoding': 'gzip, br'},
+        params=params or {},
+        body=b''
+    )
+
+
+def funcion_usuario(handler):
+    """La función original detrás de un @app.route"""
+    return handler.build().get_user_function() if hasattr(handler, 'build') else handler
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+async def medir(nombre, llamada, repeticiones, filas_por_llamada=None, preparar=None):
+    """Latencias de `repeticiones` llamadas y pico de memoria de una llamada extra.
+
+    `preparar()` se ejecuta antes de cada llamada, fuera del cronómetro y
+    de tracemalloc, y devuelve la petición que recibe `llamada`: construir
+    una subida (leer el archivo y armar el multipart) no es parte de lo
+    que se mide.
+    """
+    latencias = []
+    for _ in range(repeticiones):
+        peticion = preparar() if preparar else None
+        t0 = time.perf_counter()
+        respuesta = await llamada(peticion)
+        latencias.append(time.perf_counter() - t0)
+        if respuesta.status_code not in (200, 304):
+            raise RuntimeError(f"{nombre}: HTTP {respuesta.status_code} {respuesta.get_body()[:200]!r}")
+    total = sum(latencias)
+
+    # Pasada aparte: tracemalloc ralentiza y distorsionaría las latencias
+    peticion = preparar() if preparar else None
+    tracemalloc.start()
+    try:
+        await llamada(peticion)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    resultado = {
+        'repeticiones': repeticiones,
+        'peticiones_por_segundo': round(repeticiones / total, 2),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'pico_memoria_mb': round(pico / 2 ** 20, 2),
+    }
+    if filas_por_llamada:
+        resultado['filas_por_segundo'] = round(filas_por_llamada * repeticiones / total, 1)
+    return resultado
+
+
+async def ejecutar(filas_escenarios, repeticiones, repeticiones_subida, directorio):
+    import function_app
+    from cache import cache_respuestas, invalidar_caches
+
+    subir = funcion_usuario(function_app.subir_archivo)
+    blog = funcion_usuario(function_app.get_blog)
+    historial = funcion_usuario(function_app.get_historial)
+    health = funcion_usuario(function_app.health_check)
+
+    async def sin_cache(handler, peticion):
+        cache_respuestas.invalidar()
+        return await handler(peticion)
+
+    def tablas_vacias():
+        function_app.almacen.reiniciar_esquema()
+        invalidar_caches()
+
+    resultados = {}
+    for filas in filas_escenarios:
+        ruta = os.path.join(directorio, f'bench_{filas}.csv')
+        generar_csv(ruta, filas)
+
+        def subida_nueva():
+            # Cada subida parte de tablas vacías: si no, sería una carga repetida.
+            # modo=sync mide la ingesta completa aunque el archivo supere SUBIDA_ASINCRONA_BYTES
+            tablas_vacias()
+            return peticion_subida(ruta, params={'modo': 'sync'})
+
+        resultados[f'subir/{filas}'] = await medir(
+            'subir', subir, repeticiones_subida, filas_por_llamada=filas, preparar=subida_nueva
+        )
+        # El mismo archivo otra vez: se reconoce por su huella y no se parsea
+        resultados[f'subir_repetido/{filas}'] = await medir(
+            'subir_repetido', subir, repeticiones_subida, filas_por_llamada=filas,
+            preparar=lambda: peticion_subida(ruta)
+        )
+
+        escenarios = {
+            'blog': (blog, 'blog'),
+            'blog_frio': (lambda peticion: sin_cache(blog, peticion), 'blog'),
+            'historial': (historial, 'historial'),
+            'historial_frio': (lambda peticion: sin_cache(historial, peticion), 'historial'),
+            'health': (health, 'health'),
+            'health_frio': (lambda peticion: sin_cache(health, peticion), 'health'),
+        }
+        for nombre, (llamada, ruta_get) in escenarios.items():
+            resultados[f'{nombre}/{filas}'] = await medir(
+                nombre, llamada, repeticiones, preparar=lambda: peticion_get(ruta_get)
+            )
+        os.remove(ruta)
+    return resultados
+
+
+def imprimir(resultados):
+    print(f"{'escenario':<24}{'req/s':>10}{'filas/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'pico MB':>10}")
+    for nombre, r in resultados.items():
+        filas_s = r.get('filas_por_segundo')
+        print(f"{nombre:<24}{r['peticiones_por_segundo']:>10}{filas_s if filas_s else '-':>12}"
+              f"{r['p50_ms']:>10}{r['p99_ms']:>10}{r['pico_memoria_mb']:>10}")
+
+
+def regresiones(resultados, base, tolerancia):
+    """Escenarios que empeoran más que `tolerancia` respecto a la referencia"""
+    encontradas = []
+    for nombre, r in resultados.items():
+        anterior = base.get(nombre)
+        if not anterior:
+            continue
+        if r['p99_ms'] > anterior['p99_ms'] * (1 + tolerancia):
+            encontradas.append(f"{nombre}: p99 {anterior['p99_ms']} -> {r['p99_ms']} ms")
+        if r['peticiones_por_segundo'] < anterior['peticiones_por_segundo'] * (1 - tolerancia):
+            encontradas.append(
+                f"{nombre}: req/s {anterior['peticiones_por_segundo']} -> {r['peticiones_por_segundo']}"
+            )
+        if r['pico_memoria_mb'] > anterior['pico_memoria_mb'] * (1 + tolerancia):
+            encontradas.append(f"{nombre}: memoria {anterior['pico_memoria_mb']} -> {r['pico_memoria_mb']} MB")
+    return encontradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', default=FILAS_POR_DEFECTO,
+                        help=f'tamaños de CSV separados por comas (por defecto {FILAS_POR_DEFECTO})')
+    parser.add_argument('--repeticiones', type=int, default=200,
+                        help='llamadas por escenario de lectura')
+    parser.add_argument('--repeticiones-subida', type=int, default=3,
+                        help='subidas medidas por tamaño de CSV (cada una parte de tablas vacías)')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    parser.add_argument('--base', help='resultados de referencia para detectar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help='empeoramiento relativo admitido frente a --base')
+    args = parser.parse_args()
+
+    filas = [int(valor) for valor in args.filas.split(',') if valor.strip()]
+    with tempfile.TemporaryDirectory() as directorio:
+        resultados = asyncio.run(ejecutar(filas, args.repeticiones, args.repeticiones_subida, directorio))
+
+    imprimir(resultados)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+    if args.base:
+        with open(args.base, encoding='utf-8') as archivo:
+            encontradas = regresiones(resultados, json.load(archivo), args.tolerancia)
+        for linea in encontradas:
+            print(f"❌ Regresión {linea}")
+        if encontradas:
+            sys.exit(1)
+        print("✅ Sin regresiones frente a la referencia")
+
+
+if __name__ == '__main__':
+    main()
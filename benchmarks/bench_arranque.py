@@ -0,0 +1,149 @@
+"""Benchmark del arranque en frío: importar function_app en un intérprete nuevo.
+
+Cada repetición lanza un proceso que sólo importa function_app, igual que
+el worker de Python de Azure Functions al cargar la app, y mide el tiempo
+de la importación y el del proceso completo. La configuración es la de
+producción (BLOG_ALMACENAMIENTO=mysql): si la importación intentara
+conectarse a la base de datos, se notaría aquí. También comprueba que la
+importación no escribe archivos en el directorio de trabajo.
+
+Uso (desde la raíz del repositorio, con api/requirements.txt instalado):
+
+    python benchmarks/bench_arranque.py
+    python benchmarks/bench_arranque.py --repeticiones 20 --json arranque.json
+    python benchmarks/bench_arranque.py --base arranque.json --tolerancia 0.2
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = os.path.join(RAIZ, 'api')
+
+# Código del proceso hijo: imprime los segundos que tarda la importación
+CODIGO = (
+    "import sys, time\n"
+    f"sys.path.insert(0, {API!r})\n"
+    "inicio = time.perf_counter()\n"
+    "import function_app\n"
+    "print(time.perf_counter() - inicio)\n"
+)
+TIMEOUT_PROCESO = 60
+MODULOS_MOSTRADOS = 10
+
+
+def lanzar(directorio, entorno, importtime=False):
+    """(segundos de importación, segundos del proceso, stderr) de un intérprete nuevo"""
+    comando = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CODIGO]
+    inicio = time.perf_counter()
+    proceso = subprocess.run(comando, cwd=directorio, env=entorno, capture_output=True,
+                             text=True, timeout=TIMEOUT_PROCESO)
+    total = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        raise RuntimeError(f"La importación falló:\n{proceso.stderr[-2000:]}")
+    return float(proceso.stdout.strip().splitlines()[-1]), total, proceso.stderr
+
+
+def modulos_lentos(salida_importtime, cantidad=MODULOS_MOSTRADOS):
+    """Importaciones directas de function_app con más tiempo acumulado (-X importtime).
+
+    Cada módulo se imprime después de los que importa, con dos espacios
+    más de sangría por nivel: los de nivel 1 previos a function_app son
+    sus importaciones directas.
+    """
+    pendientes = []
+    for linea in salida_importtime.splitlines():
+        campos = linea.split('|')
+        if not linea.startswith('import time:') or len(campos) != 3 or not campos[1].strip().isdigit():
+            continue
+        nombre = campos[2][1:]
+        nivel = (len(nombre) - len(nombre.lstrip())) // 2
+        if nivel == 1:
+            pendientes.append((int(campos[1]), nombre.strip()))
+        elif nivel == 0:
+            if nombre.strip() == 'function_app':
+                return sorted(pendientes, reverse=True)[:cantidad]
+            pendientes = []
+    return []
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def medir(repeticiones, backend):
+    entorno = dict(os.environ, BLOG_ALMACENAMIENTO=backend)
+    importaciones = []
+    procesos = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for _ in range(repeticiones):
+            importacion, total, _ = lanzar(directorio, entorno)
+            importaciones.append(importacion)
+            procesos.append(total)
+        # Pasada aparte: -X importtime ralentiza y distorsionaría los tiempos
+        _, _, salida = lanzar(directorio, entorno, importtime=True)
+        archivos = os.listdir(directorio)
+    resultados = {}
+    for nombre, valores in (('importacion', importaciones), ('proceso', procesos)):
+        resultados[f'arranque/{nombre}'] = {
+            'repeticiones': repeticiones,
+            'p50_ms': round(percentil(valores, 50) * 1000, 1),
+            'p99_ms': round(percentil(valores, 99) * 1000, 1),
+        }
+    return resultados, modulos_lentos(salida), archivos
+
+
+def regresiones(resultados, base, tolerancia):
+    """Medidas que empeoran más que `tolerancia` respecto a la referencia"""
+    encontradas = []
+    for nombre, r in resultados.items():
+        anterior = base.get(nombre)
+        if anterior and r['p50_ms'] > anterior['p50_ms'] * (1 + tolerancia):
+            encontradas.append(f"{nombre}: p50 {anterior['p50_ms']} -> {r['p50_ms']} ms")
+    return encontradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=10, help='procesos lanzados')
+    parser.add_argument('--almacenamiento', default='mysql',
+                        help='BLOG_ALMACENAMIENTO del proceso hijo (por defecto mysql, como en producción)')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    parser.add_argument('--base', help='resultados de referencia para detectar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help='empeoramiento relativo admitido frente a --base')
+    args = parser.parse_args()
+
+    resultados, modulos, archivos = medir(args.repeticiones, args.almacenamiento)
+
+    print(f"{'medida':<24}{'p50 ms':>10}{'p99 ms':>10}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<24}{r['p50_ms']:>10}{r['p99_ms']:>10}")
+    print("\nMódulos más lentos de importar (acumulado):")
+    for microsegundos, nombre in modulos:
+        print(f"  {nombre:<40}{microsegundos / 1000:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+    fallos = [f"la importación escribió archivos: {', '.join(archivos)}"] if archivos else []
+    if args.base:
+        with open(args.base, encoding='utf-8') as archivo:
+            fallos += regresiones(resultados, json.load(archivo), args.tolerancia)
+    for linea in fallos:
+        print(f"❌ {linea}")
+    if fallos:
+        sys.exit(1)
+    if args.base:
+        print("✅ Sin regresiones frente a la referencia")
+
+
+if __name__ == '__main__':
+    main()